@@ -0,0 +1,270 @@
+# 다중 스케일 burst 탐지 엔진 (정렬된 int64 타임스탬프 기반)
+
+import numpy as np
+import pandas as pd
+
+# 기본 탐지 스케일 (초): 1분, 10분, 1시간, 1일
+DEFAULT_WINDOWS = (60, 600, 3600, 86400)
+
+EPISODE_COLUMNS = ['scale', 'start', 'end', 'count', 'volume', 'silence_after']
+
+
+def to_epoch_seconds(series):
+    """
+    confirmed 컬럼 → epoch 초 int64 배열 (NaT는 제외하지 않고 호출 전에 정리되어 있어야 함)
+    """
+    ts = pd.to_datetime(series, errors='coerce', utc=True)
+    return ts.to_numpy(dtype='datetime64[s]').astype(np.int64)
+
+
+def window_left_index(ts, window):
+    """
+    정렬된 ts에서 각 i에 대해 (ts[i] - window, ts[i]] 구간의 첫 인덱스
+    - 두 포인터 스윕의 왼쪽 포인터 위치와 동일 (searchsorted로 벡터화)
+    """
+    return np.searchsorted(ts, ts - window, side='right')
+
+
+def rolling_window_counts(ts, window):
+    """
+    pandas rolling(f'{window}s').count()와 같은 값 (현재 행 포함, 시간 창 (t-window, t])
+    - 인덱스 재설정/복사 없이 정렬된 배열 하나로 계산
+    """
+    ts = np.asarray(ts, dtype=np.int64)
+    return np.arange(len(ts)) - window_left_index(ts, window) + 1
+
+
+def tx_events(df):
+    """
+    출력(output) 단위 행을 트랜잭션 단위 이벤트로 압축
+    - 같은 트랜잭션의 여러 출력이 burst로 오인되지 않도록 tx_hash 기준 합산
+    - 반환: (정렬된 epoch 초 배열, 트랜잭션별 BTC 합계 배열)
+    """
+    if df.empty or 'confirmed' not in df.columns:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=float)
+
+    events = pd.DataFrame({
+        'ts': pd.to_datetime(df['confirmed'], errors='coerce', utc=True),
+        'btc_value': df['btc_value'].astype(float) if 'btc_value' in df.columns else 0.0,
+        'tx_hash': df['tx_hash'] if 'tx_hash' in df.columns else np.arange(len(df)),
+    }).dropna(subset=['ts'])
+    events = events.groupby('tx_hash', sort=False).agg(ts=('ts', 'first'), btc_value=('btc_value', 'sum'))
+    events = events.sort_values('ts', kind='mergesort')
+    return events['ts'].to_numpy(dtype='datetime64[s]').astype(np.int64), events['btc_value'].to_numpy()
+
+
+def find_bursts(ts, values, window, min_count):
+    """
+    단일 스케일 burst 구간 탐지
+    - window초 안에 min_count건 이상이 몰린 창들을 겹치는 것끼리 하나의 에피소드로 병합
+    - 반환: (시작 인덱스, 끝 인덱스) 배열 쌍 (끝 포함)
+    """
+    if len(ts) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    left = window_left_index(ts, window)
+    counts = np.arange(len(ts)) - left + 1
+    hits = np.flatnonzero(counts >= min_count)
+    if hits.size == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    # left는 단조 증가 → 이전 burst 끝보다 오른쪽에서 시작하면 새 에피소드
+    new_episode = np.ones(hits.size, dtype=bool)
+    new_episode[1:] = left[hits[1:]] > hits[:-1]
+    heads = np.flatnonzero(new_episode)
+
+    starts = left[hits[heads]]
+    ends = np.append(hits[heads[1:] - 1], hits[-1])
+    return starts, ends
+
+
+def _episode_records(ts, values, starts, ends, scale):
+    if starts.size == 0:
+        return pd.DataFrame(columns=EPISODE_COLUMNS)
+
+    cum = np.concatenate([[0.0], np.cumsum(values)])
+    next_ts = np.append(ts[1:], np.iinfo(np.int64).max)
+    silence = np.where(ends + 1 < len(ts), next_ts[ends] - ts[ends], -1)
+    return pd.DataFrame({
+        'scale': scale,
+        'start': pd.to_datetime(ts[starts], unit='s', utc=True),
+        'end': pd.to_datetime(ts[ends], unit='s', utc=True),
+        'count': ends - starts + 1,
+        'volume': cum[ends + 1] - cum[starts],
+        'silence_after': silence,
+    })
+
+
+def detect_multiscale_bursts(ts, values, windows=DEFAULT_WINDOWS, min_count=3):
+    """
+    여러 시간 스케일에서 burst 에피소드 탐지 (스케일당 O(n))
+    - 반환: scale / start / end / count / volume / silence_after(초, 마지막이면 -1) 레코드
+    """
+    ts = np.asarray(ts, dtype=np.int64)
+    values = np.asarray(values, dtype=float)
+    frames = []
+    for window in windows:
+        starts, ends = find_bursts(ts, values, window, min_count)
+        frames.append(_episode_records(ts, values, starts, ends, window))
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=EPISODE_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def kleinberg_states(ts, s=3.0, gamma=1.0, back=None, states=None, chunk_size=1 << 20):
+    """
+    Kleinberg 2-상태 burst 모델 (Viterbi, O(n))
+    - 기본 상태: 평균 도착률 a0 = n / T, burst 상태: a1 = s * a0
+    - 간격 x의 비용: a*x - ln(a) (지수분포 음의 로그우도)
+    - 상태 상승 비용: gamma * ln(n + 1) (n = 간격 수, 간격이 1개여도 0이 되지 않도록), 하강 비용: 0
+    - 간격 비용은 chunk_size 단위로 계산하므로 ts/back/states에 memmap을 넘기면 메모리 사용이 제한됨
+    - 반환: 각 간격(ts[i] → ts[i+1])의 상태 배열 (0=기본, 1=burst)
+    """
+    n = max(len(ts) - 1, 0)
+    if states is None:
+        states = np.empty(n, dtype=np.int8)
+    if n == 0:
+        return states
+
+    total = float(int(ts[-1]) - int(ts[0]))
+    if total <= 0:
+        states[:] = 1
+        return states
+
+    a0 = n / total
+    a1 = s * a0
+    up = gamma * np.log(n + 1)
+    if back is None:
+        back = np.zeros((n, 2), dtype=np.int8)
+
+    # 2-상태 Viterbi: 상태별 누적 비용과 역추적 포인터만 유지
+    c0 = c1 = None
+    for lo in range(0, n, chunk_size):
+        hi = min(lo + chunk_size, n)
+        gaps = np.diff(np.asarray(ts[lo:hi + 1], dtype=np.int64)).astype(float)
+        cost0 = a0 * gaps - np.log(a0)
+        cost1 = a1 * gaps - np.log(a1)
+        step = np.zeros((hi - lo, 2), dtype=np.int8)
+        for j in range(hi - lo):
+            if c0 is None:
+                c0, c1 = cost0[0], up + cost1[0]
+                continue
+            stay0, from1 = c0, c1
+            if stay0 <= from1:
+                n0 = stay0 + cost0[j]
+            else:
+                n0, step[j, 0] = from1 + cost0[j], 1
+            from0, stay1 = c0 + up, c1
+            if stay1 <= from0:
+                n1, step[j, 1] = stay1 + cost1[j], 1
+            else:
+                n1 = from0 + cost1[j]
+            c0, c1 = n0, n1
+        back[lo:hi] = step
+
+    state = 0 if c0 <= c1 else 1
+    for hi in range(n, 0, -chunk_size):
+        lo = max(hi - chunk_size, 0)
+        step = np.asarray(back[lo:hi])
+        out = np.empty(hi - lo, dtype=np.int8)
+        for j in range(hi - lo - 1, -1, -1):
+            out[j] = state
+            state = step[j, state]
+        states[lo:hi] = out
+    return states
+
+
+def state_runs(states, chunk_size=1 << 20):
+    """
+    상태 배열에서 연속된 burst(1) 구간 찾기 (chunk_size 단위로 읽어 memmap도 전체를 메모리에 올리지 않음)
+    - 반환: (구간 시작 인덱스, 구간 마지막 다음 인덱스) 배열 쌍
+    """
+    starts, ends = [], []
+    prev = 0
+    for lo in range(0, len(states), chunk_size):
+        seg = np.asarray(states[lo:lo + chunk_size], dtype=np.int8)
+        edges = np.diff(seg, prepend=np.int8(prev))
+        starts.append(lo + np.flatnonzero(edges == 1))
+        ends.append(lo + np.flatnonzero(edges == -1))
+        prev = seg[-1]
+    if prev == 1:
+        ends.append(np.asarray([len(states)]))
+    if not starts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(starts).astype(np.int64), np.concatenate(ends).astype(np.int64)
+
+
+def silence_episodes_from_states(ts, values, states, min_count=3, silence_factor=10.0, min_silence_sec=3600,
+                                 median_gap=None):
+    """
+    Kleinberg 상태 배열 → burst 이후 장시간 공백 에피소드
+    - median_gap을 주지 않으면 ts 전체 간격의 중앙값을 계산
+    """
+    # 간격 i가 burst 상태면 이벤트 i, i+1이 같은 burst에 속함
+    starts, ends = state_runs(states)
+    if starts.size == 0:
+        return pd.DataFrame(columns=EPISODE_COLUMNS)
+
+    if median_gap is None:
+        median_gap = float(np.median(np.diff(np.asarray(ts))))
+    threshold = max(min_silence_sec, silence_factor * median_gap)
+
+    # 조건을 먼저 걸러 남은 에피소드만 값 조회 (ts/values가 memmap이어도 필요한 위치만 읽음)
+    has_next = ends + 1 < len(ts)
+    silence = np.full(len(ends), -1, dtype=np.int64)
+    silence[has_next] = np.asarray(ts[ends[has_next] + 1]) - np.asarray(ts[ends[has_next]])
+    keep = (ends - starts + 1 >= min_count) & (silence >= threshold)
+    starts, ends, silence = starts[keep], ends[keep], silence[keep]
+    if starts.size == 0:
+        return pd.DataFrame(columns=EPISODE_COLUMNS)
+
+    return pd.DataFrame({
+        'scale': -1,
+        'start': pd.to_datetime(np.asarray(ts[starts]), unit='s', utc=True),
+        'end': pd.to_datetime(np.asarray(ts[ends]), unit='s', utc=True),
+        'count': ends - starts + 1,
+        'volume': [float(np.sum(values[a:b + 1])) for a, b in zip(starts, ends)],
+        'silence_after': silence,
+    })
+
+
+def burst_silence_episodes(df, s=3.0, gamma=1.0, min_count=3, silence_factor=10.0, min_silence_sec=3600):
+    """
+    burst 이후 장시간 공백이 이어지는 에피소드 (협박 사기 패턴)
+    - Kleinberg burst 상태 구간 중 min_count건 이상인 것만 사용
+    - 직후 공백이 max(min_silence_sec, silence_factor × 전체 간격 중앙값) 이상이면 채택
+    - 반환: scale(-1=Kleinberg) / start / end / count / volume / silence_after 레코드
+    """
+    ts, values = tx_events(df)
+    states = kleinberg_states(ts, s=s, gamma=gamma)
+    return silence_episodes_from_states(ts, values, states, min_count=min_count,
+                                        silence_factor=silence_factor, min_silence_sec=min_silence_sec)
+
+
+def flag_times_in_episodes(row_ts, episodes):
+    """
+    epoch 초 배열의 각 시각이 어떤 에피소드의 [start, end] 안에 있는지 여부
+    """
+    row_ts = np.asarray(row_ts, dtype=np.int64)
+    flags = np.zeros(len(row_ts), dtype=bool)
+    if episodes.empty or len(row_ts) == 0:
+        return flags
+
+    ep = episodes.sort_values('start')
+    starts = to_epoch_seconds(ep['start'])
+    ends = np.maximum.accumulate(to_epoch_seconds(ep['end']))
+    idx = np.searchsorted(starts, row_ts, side='right') - 1
+    valid = idx >= 0
+    flags[valid] = row_ts[valid] <= ends[idx[valid]]
+    return flags
+
+
+def flag_rows_in_episodes(confirmed, episodes):
+    """
+    에피소드 레코드를 행 단위 플래그로 변환 (점수화 호환용)
+    - 각 행의 confirmed가 어떤 에피소드의 [start, end] 안에 있으면 True
+    """
+    if episodes.empty or len(confirmed) == 0:
+        return np.zeros(len(confirmed), dtype=bool)
+    return flag_times_in_episodes(to_epoch_seconds(confirmed), episodes)
@@ -0,0 +1,293 @@
+# 대형(whale) 주소용 청크 단위 분석: 페이지 스트리밍 + 컬럼 디스크 spill + 경계 상태 유지
+
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from config import CHUNK_ROWS, SPILL_DIR
+from fetch_data import parse_blockcypher_transactions
+from burst_detector import kleinberg_states, silence_episodes_from_states, flag_times_in_episodes
+from reference_stats import global_percentile
+from calculate_score import calculate_total_score
+
+# spill 컬럼 (출력 행 단위 / 트랜잭션 이벤트 단위)
+ROW_COLUMNS = {'ts': np.int64, 'btc': np.float64, 'tx': np.uint64}
+EVENT_COLUMNS = {'ev_ts': np.int64, 'ev_btc': np.float64}
+
+
+def _ratio_score(flagged, total):
+    # calculate_score의 비율 × 25 → 정수화 → 최대 25점과 같은 계산
+    ratio = flagged / total if total > 0 else 0
+    return min(int(ratio * 25), 25)
+
+
+class _Spill:
+    """
+    컬럼별 append-only 바이너리 파일 + memmap 조회
+    """
+
+    def __init__(self, root, columns, prefix=""):
+        self.root = root
+        self.prefix = prefix
+        self.columns = columns
+        self.size = 0
+        for name in columns:
+            open(self._path(name), "wb").close()
+
+    def _path(self, name):
+        return os.path.join(self.root, f"{self.prefix}{name}.bin")
+
+    def append(self, **arrays):
+        for name, dtype in self.columns.items():
+            with open(self._path(name), "ab") as f:
+                f.write(np.ascontiguousarray(arrays[name], dtype=dtype).tobytes())
+        self.size += len(next(iter(arrays.values())))
+
+    def column(self, name):
+        if self.size == 0:
+            return np.empty(0, dtype=self.columns[name])
+        return np.memmap(self._path(name), dtype=self.columns[name], mode='r', shape=(self.size,))
+
+
+def _write_run(spill, buffered):
+    # 버퍼에 모인 페이지들을 시각 기준 안정 정렬해 정렬된 run 하나로 기록
+    ts = np.concatenate([b[0] for b in buffered])
+    btc = np.concatenate([b[1] for b in buffered])
+    tx = np.concatenate([b[2] for b in buffered])
+    order = np.argsort(ts, kind='stable')
+    spill.append(ts=ts[order], btc=btc[order], tx=tx[order])
+
+
+def spill_pages(pages, spill, run_rows=CHUNK_ROWS):
+    """
+    BlockCypher 페이지를 하나씩 파싱해 확정 시각(ns)/BTC/tx_hash 해시 컬럼만 디스크에 기록
+    - confirmed가 없는 행은 in-memory 경로(detect_high_frequency의 dropna)와 같게 제외
+    - 약 run_rows행씩 모아 시각 기준으로 정렬한 run으로 기록 (외부 병합 정렬의 1단계)
+    - 반환: run 경계 리스트 (run i = [bounds[i], bounds[i + 1]))
+    """
+    bounds, buffered, buffered_rows = [0], [], 0
+    for page in pages:
+        df = parse_blockcypher_transactions(page)
+        if df.empty:
+            continue
+        ts = pd.to_datetime(df['confirmed'], errors='coerce', utc=True)
+        valid = ts.notna().to_numpy()
+        if not valid.any():
+            continue
+        buffered.append((
+            ts[valid].to_numpy(dtype='datetime64[ns]').astype(np.int64),
+            df['btc_value'].to_numpy(dtype=float)[valid],
+            pd.util.hash_array(df['tx_hash'].astype(str).to_numpy()[valid]),
+        ))
+        buffered_rows += int(valid.sum())
+        if buffered_rows >= run_rows:
+            _write_run(spill, buffered)
+            bounds.append(spill.size)
+            buffered, buffered_rows = [], 0
+    if buffered:
+        _write_run(spill, buffered)
+        bounds.append(spill.size)
+    return bounds
+
+
+def merge_runs(runs, bounds, out, chunk_rows=CHUNK_ROWS):
+    """
+    정렬된 run들을 (시각, run 파일 내 위치) 순서로 k-way 병합해 out에 기록 (외부 병합 정렬의 2단계)
+    - run 파일 내 위치는 run 순서 + run 내부 안정 정렬 순서 → 원래 도착 순서와 같은 동순위 처리
+    - run마다 chunk_rows / run 수 크기의 버퍼만 유지, 각 행은 한 번씩만 읽음
+    - 버퍼가 모두 비지 않은 run들의 마지막 키 중 최솟값 이하만 내보냄 (이후 읽을 행은 모두 그보다 큼)
+    """
+    k = len(bounds) - 1
+    if k <= 0:
+        return
+    block = max(1024, chunk_rows // k)
+    columns = {name: runs.column(name) for name in ROW_COLUMNS}
+    pos = list(bounds[:-1])
+    ends = bounds[1:]
+    buffers = [None] * k
+
+    while True:
+        for r in range(k):
+            if (buffers[r] is None or len(buffers[r]['pos']) == 0) and pos[r] < ends[r]:
+                hi = min(pos[r] + block, ends[r])
+                buffers[r] = {name: np.asarray(col[pos[r]:hi]) for name, col in columns.items()}
+                buffers[r]['pos'] = np.arange(pos[r], hi)
+                pos[r] = hi
+        active = [r for r in range(k) if buffers[r] is not None and len(buffers[r]['pos'])]
+        if not active:
+            return
+
+        cut = min(((buffers[r]['ts'][-1], buffers[r]['pos'][-1]) for r in active if pos[r] < ends[r]),
+                  default=None)
+        emitted = []
+        for r in active:
+            buf = buffers[r]
+            if cut is None:
+                n = len(buf['pos'])
+            else:
+                n = int(((buf['ts'] < cut[0]) | ((buf['ts'] == cut[0]) & (buf['pos'] <= cut[1]))).sum())
+            if n:
+                emitted.append({name: values[:n] for name, values in buf.items()})
+                buffers[r] = {name: values[n:] for name, values in buf.items()}
+        merged = {name: np.concatenate([e[name] for e in emitted]) for name in emitted[0]}
+        order = np.lexsort((merged['pos'], merged['ts']))
+        out.append(**{name: merged[name][order] for name in ROW_COLUMNS})
+
+
+def _chunks(n, chunk_rows):
+    for lo in range(0, n, chunk_rows):
+        yield lo, min(lo + chunk_rows, n)
+
+
+def _gap_chunks(ev_ts, n_gaps, chunk_rows):
+    for lo, hi in _chunks(n_gaps, chunk_rows):
+        yield np.diff(np.asarray(ev_ts[lo:hi + 1]))
+
+
+def streaming_median_gap(ev_ts, chunk_rows=CHUNK_ROWS):
+    """
+    정렬된 이벤트 시각(초)의 간격 중앙값 (np.median(np.diff(ev_ts))와 같은 값)
+    - 간격이 chunk_rows 이하면 바로 계산
+    - 그보다 많으면 값 범위 이분 탐색 + 청크별 개수 세기로 k번째 값을 정확히 선택 (전체 간격 배열을 만들지 않음)
+    """
+    n_gaps = max(len(ev_ts) - 1, 0)
+    if n_gaps == 0:
+        return 0.0
+    if n_gaps <= chunk_rows:
+        return float(np.median(np.diff(np.asarray(ev_ts))))
+
+    low = min(int(g.min()) for g in _gap_chunks(ev_ts, n_gaps, chunk_rows))
+    high = max(int(g.max()) for g in _gap_chunks(ev_ts, n_gaps, chunk_rows))
+
+    def kth(k):
+        lo, hi = low, high
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if sum(int((g <= mid).sum()) for g in _gap_chunks(ev_ts, n_gaps, chunk_rows)) >= k + 1:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    return (kth((n_gaps - 1) // 2) + kth(n_gaps // 2)) / 2.0
+
+
+def run_analysis_chunked(pages, reference=None, chunk_rows=CHUNK_ROWS, spill_dir=SPILL_DIR,
+                         z_threshold=0.5, pct_threshold=0.99):
+    """
+    pipeline.run_analysis와 같은 점수를 청크 단위로 계산 (행 단위 DataFrame을 만들지 않음)
+    - pages: BlockCypher 응답 페이지 iterable (예: fetch_data.iter_transaction_pages)
+    - 메모리: 페이지 1개 + 약 chunk_rows행 분량의 버퍼만 유지 (전체 길이 배열은 모두 디스크 memmap)
+    - 1단계: 페이지 → chunk_rows행 단위 정렬 run으로 컬럼 spill
+    - 2단계: run들을 k-way 병합해 시각 기준 안정 정렬된 컬럼 spill 작성
+    - 3단계: 정렬된 컬럼을 청크 단위로 순차 읽기, 청크 경계마다 직전 시각/tx 상태를 넘겨
+             간격·텀블러 플래그·트랜잭션 이벤트 계산, 금액 평균/분산은 청크별 병합(Chan)
+    - 4단계: 이벤트 memmap 위에서 Kleinberg 상태 계산, 간격 중앙값은 스트리밍 선택 → burst-공백 에피소드
+    - 5단계: 고액(z-score 또는 전체 분포 백분위)·협박 플래그 집계
+    - 반환: (freq_score, amount_score, tumbler_score, extortion_score, total_score, 요약 dict)
+    """
+    os.makedirs(spill_dir, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=spill_dir) as root:
+        runs = _Spill(root, ROW_COLUMNS, prefix="run_")
+        bounds = spill_pages(pages, runs, run_rows=chunk_rows)
+        total = runs.size
+        summary = {'rows': total, 'runs': len(bounds) - 1, 'tx_events': 0, 'tumbler_flags': 0,
+                   'amount_flags': 0, 'extortion_flags': 0}
+        if total == 0:
+            return 0, 0, 0, 0, 0, summary
+
+        rows = _Spill(root, ROW_COLUMNS, prefix="sorted_")
+        merge_runs(runs, bounds, rows, chunk_rows)
+        ts_col, btc_col, tx_col = rows.column('ts'), rows.column('btc'), rows.column('tx')
+
+        events = _Spill(root, EVENT_COLUMNS)
+        prev_ts, prev_tx = None, None
+        count, mean, m2 = 0, 0.0, 0.0
+        tumbler_flags = 0
+        for lo, hi in _chunks(total, chunk_rows):
+            ts, btc, tx = np.asarray(ts_col[lo:hi]), np.asarray(btc_col[lo:hi]), np.asarray(tx_col[lo:hi])
+
+            # 간격(초): 첫 행은 0, 청크 첫 행은 직전 청크 마지막 시각 기준
+            prev = np.empty(len(ts), dtype=np.int64)
+            prev[1:] = ts[:-1]
+            prev[0] = ts[0] if prev_ts is None else prev_ts
+            interval = (ts - prev) / 1e9
+            tumbler_flags += int(((btc > 0.05) & (np.abs(interval) > 30)).sum())
+
+            # 트랜잭션 이벤트: 같은 tx의 출력은 같은 시각에 연속으로 놓임
+            prev_tx_arr = np.empty(len(tx), dtype=np.uint64)
+            prev_tx_arr[1:] = tx[:-1]
+            new_event = (tx != prev_tx_arr) | (ts != prev)
+            if prev_tx is None:
+                new_event[0] = True
+            else:
+                new_event[0] = (tx[0] != prev_tx) or (ts[0] != prev_ts)
+            heads = np.flatnonzero(new_event)
+            ev_btc = np.add.reduceat(btc, heads) if heads.size else np.empty(0)
+            if heads.size and heads[0] != 0:
+                # 직전 청크에서 시작된 트랜잭션의 나머지 출력 → 마지막 이벤트 값에 더함
+                _add_to_last_event(events, btc[:heads[0]].sum())
+            elif not heads.size:
+                _add_to_last_event(events, btc.sum())
+            events.append(ev_ts=ts[heads] // 10**9, ev_btc=ev_btc)
+
+            # 금액 평균/분산 병합
+            n_b, mean_b = len(btc), float(btc.mean())
+            m2_b = float(((btc - mean_b) ** 2).sum())
+            delta = mean_b - mean
+            new_count = count + n_b
+            mean += delta * n_b / new_count
+            m2 += m2_b + delta ** 2 * count * n_b / new_count
+            count = new_count
+
+            prev_ts, prev_tx = int(ts[-1]), tx[-1]
+
+        std = np.sqrt(m2 / (count - 1)) if count > 1 else np.nan
+
+        # Kleinberg 상태 (역추적 포인터/상태도 디스크에)
+        ev_ts, ev_btc = events.column('ev_ts'), events.column('ev_btc')
+        n_gaps = max(events.size - 1, 0)
+        back = np.lib.format.open_memmap(os.path.join(root, "back.npy"), mode='w+', dtype=np.int8,
+                                         shape=(max(n_gaps, 1), 2))
+        states = np.lib.format.open_memmap(os.path.join(root, "states.npy"), mode='w+', dtype=np.int8,
+                                           shape=(max(n_gaps, 1),))[:n_gaps]
+        kleinberg_states(ev_ts, back=back, states=states, chunk_size=chunk_rows)
+        median_gap = streaming_median_gap(ev_ts, chunk_rows)
+        episodes = silence_episodes_from_states(ev_ts, ev_btc, states, median_gap=median_gap)
+
+        amount_flags, extortion_flags = 0, 0
+        for lo, hi in _chunks(total, chunk_rows):
+            btc = np.asarray(btc_col[lo:hi])
+            pct = global_percentile(reference, 'amount', btc)
+            if pct is not None:
+                amount_flags += int((pct >= pct_threshold).sum())
+            elif not (std == 0 or np.isnan(std)):
+                amount_flags += int((np.abs((btc - mean) / std) > z_threshold).sum())
+            extortion_flags += int(flag_times_in_episodes(np.asarray(ts_col[lo:hi]) // 10**9, episodes).sum())
+
+        summary.update({
+            'tx_events': events.size,
+            'tumbler_flags': tumbler_flags,
+            'amount_flags': amount_flags,
+            'extortion_flags': extortion_flags,
+            'episodes': len(episodes),
+        })
+
+    # detect_high_frequency는 high_freq_flag를 만들지 않으므로 in-memory 경로와 같게 0점
+    freq_score = 0
+    amount_score = _ratio_score(amount_flags, total)
+    tumbler_score = _ratio_score(tumbler_flags, total)
+    extortion_score = _ratio_score(extortion_flags, total)
+    total_score = calculate_total_score(freq_score, amount_score, tumbler_score, extortion_score)
+    return freq_score, amount_score, tumbler_score, extortion_score, total_score, summary
+
+
+def _add_to_last_event(events, value):
+    if events.size == 0:
+        return
+    path = events._path('ev_btc')
+    last = np.memmap(path, dtype=np.float64, mode='r+', offset=(events.size - 1) * 8, shape=(1,))
+    last[0] += value
+    last.flush()
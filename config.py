@@ -5,4 +5,58 @@ THRESHOLDS = {
     'large_amount': 1.5,
     'repeat_receiver': 3,
     'irregular_time': 2.0
-}
\ No newline at end of file
+}
+
+# 주소별 시간 버킷 롤업 저장 위치 및 해상도 (버킷 폭, 초)
+ROLLUP_DIR = "data/rollups"
+ROLLUP_RESOLUTIONS = {
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400,
+    'week': 604800
+}
+# 버킷별 distinct counterparty 스케치 크기 (KMV, 이 수 미만은 정확한 개수)
+ROLLUP_DISTINCT_K = 64
+# 해상도별 세그먼트 파일 1개에 담는 버킷 수 (증분 갱신 시 새 거래가 닿은 세그먼트만 다시 씀)
+ROLLUP_SEGMENT_BUCKETS = 4096
+
+# 전체 분석 주소 기준 참조 분포 (분위수 스케치) 저장 위치 및 최소 표본 수
+REFERENCE_STATS_PATH = "data/reference_stats.npz"
+REFERENCE_MIN_COUNT = 1000
+
+# 주소 ↔ 트랜잭션 그래프 저장소 위치
+GRAPH_STORE_DIR = "data/graph"
+# 정리되지 않은 간선 로그가 이 수를 넘으면 CSR 재작성
+GRAPH_COMPACT_TAIL = 200000
+# compact 시 기존 CSR/인덱스를 memmap에서 한 번에 복사하는 레코드 수 (최대 메모리 사용량 기준)
+GRAPH_COMPACT_CHUNK = 1000000
+
+# 세션 간 요청 병합 (single-flight) 결과 보관 개수 및 유효 시간 (초)
+SINGLEFLIGHT_MAX_ENTRIES = 64
+SINGLEFLIGHT_FETCH_TTL_SEC = 30
+SINGLEFLIGHT_ANALYSIS_TTL_SEC = 600
+
+# 대형 주소 청크 분석: 청크당 행 수, 중간 컬럼 spill 위치
+CHUNK_ROWS = 100000
+SPILL_DIR = "data/spill"
+
+# 선언형 탐지 규칙 파일
+RULES_PATH = "rules.json"
+
+# 제재 주소 목록 출처 (이름 → 파일) 및 버전/역색인 저장 위치
+SANCTION_SOURCES = {
+    'ofac_dprk': "bitcoin_sanctioned_all.txt"
+}
+SANCTIONS_DIR = "data/sanctions"
+# 거래 상대 주소가 제재 목록에 있을 때의 최소 위험 점수 (주소 자체가 목록에 있으면 100)
+SANCTION_EXPOSURE_SCORE = 80
+
+# 분석 결과 Parquet 저장소 위치, 배치 기록 기준 (행 수 / 최대 대기 초), 압축 방식
+RESULTS_DIR = "data/results"
+RESULTS_BATCH_ROWS = 50000
+RESULTS_FLUSH_SEC = 60
+RESULTS_COMPRESSION = "zstd"
+
+# 트랜잭션 형태 피처: CoinJoin 판단 최소 동일 금액 출력 수, 잔돈 추정용 "딱 떨어지는 금액" 단위 (사토시, 0.001 BTC)
+COINJOIN_MIN_EQUAL_OUTPUTS = 3
+ROUND_VALUE_SATOSHI = 100000
@@ -1,5 +1,7 @@
 import pandas as pd
 import streamlit as st
+from burst_detector import burst_silence_episodes, flag_rows_in_episodes
+from reference_stats import global_percentile
 
 # 이상 탐지 1: 고빈도 반복 전송 (기준 완화)
 def detect_high_frequency(df):
@@ -10,7 +12,7 @@ def detect_high_frequency(df):
     df['confirmed'] = pd.to_datetime(df['confirmed'], errors='coerce')
     df = df.dropna(subset=['confirmed'])
 
-    df = df.sort_values(by='confirmed')
+    df = df.sort_values(by='confirmed', kind='mergesort')  # 안정 정렬: 같은 시각 거래 순서 고정
     df['time_diff'] = df['confirmed'].diff().dt.total_seconds().fillna(0)
 
     # 기준 시간보다 짧은 간격 필터링
@@ -22,18 +24,24 @@ def detect_high_frequency(df):
     return df
 
 # 이상 탐지 2: 고액 이상치 전송 (기준 완화)
-def detect_high_amount(df, z_threshold=0.5):
+# - reference(전체 분석 주소 분포)가 충분하면 전체 기준 백분위로 판단
+def detect_high_amount(df, z_threshold=0.5, reference=None, pct_threshold=0.99):
     if df.empty or 'btc_value' not in df.columns:
         df['high_amount_flag'] = False
         return df
 
     mean = df['btc_value'].mean()
     std = df['btc_value'].std()
+    if not (std == 0 or pd.isna(std)):
+        df['z_score'] = (df['btc_value'] - mean) / std
 
-    if std == 0 or pd.isna(std):
+    pct = global_percentile(reference, 'amount', df['btc_value'].to_numpy(dtype=float))
+    if pct is not None:
+        df['amount_pct'] = pct
+        df['high_amount_flag'] = df['amount_pct'] >= pct_threshold
+    elif std == 0 or pd.isna(std):
         df['high_amount_flag'] = False
     else:
-        df['z_score'] = (df['btc_value'] - mean) / std
         df['high_amount_flag'] = df['z_score'].abs() > z_threshold
     return df
 
@@ -44,19 +52,20 @@ def detect_tumbler_pattern(df):
     if df.empty or 'confirmed' not in df.columns or 'btc_value' not in df.columns:
         df['tumbler_flag'] = 0
         return df
-    df = df.sort_values('confirmed')
+    df = df.sort_values('confirmed', kind='mergesort')
     df['interval_diff'] = df['confirmed'].diff().dt.total_seconds().fillna(0)
     df['tumbler_flag'] = ((df['btc_value'] > 0.05) & (df['interval_diff'].abs() > 30)).astype(int)
     return df
 
-# 이상 탐지 4: 협박/사기 패턴
+# 이상 탐지 4: 협박/사기 패턴 (burst 이후 장시간 공백 에피소드에 속한 거래만 표시)
 def detect_extortion_pattern(df):
     if 'confirmed' not in df.columns or df['confirmed'].isnull().all():
         df['extortion_flag'] = 0
         return df
-    df = df.sort_values('confirmed')
+    df = df.sort_values('confirmed', kind='mergesort')
     df['interval_diff'] = df['confirmed'].diff().dt.total_seconds().fillna(0)
-    df['extortion_flag'] = (df['interval_diff'] > 120).astype(int)
+    episodes = burst_silence_episodes(df)
+    df['extortion_flag'] = flag_rows_in_episodes(df['confirmed'], episodes).astype(int)
     return df
 
 # 점수 계산 함수들
@@ -109,7 +118,7 @@ def run_analysis(df):
             st.error("❌ 'btc_value'와 'total' 모두 없어 0으로 처리되었습니다.")
 
     # 간격 계산
-    df = df.sort_values('confirmed')
+    df = df.sort_values('confirmed', kind='mergesort')
     df['interval_diff'] = df['confirmed'].diff().dt.total_seconds().fillna(0)
 
     st.write("✅ [Debug] 날짜 및 간격 계산 완료")
@@ -1,31 +1,219 @@
-import requests
 import os
 from dotenv import load_dotenv
 import pandas as pd
 from dateutil.parser import parse
 import streamlit as st
 import json
+from collections import Counter
+from http_transport import http_get_json
+from config import COINJOIN_MIN_EQUAL_OUTPUTS, ROUND_VALUE_SATOSHI
 
 # 환경변수 로딩
 load_dotenv()
-token = os.getenv("BLOCKCYPHER_TOKEN") or "93464419740141a7b00fbcb440e65595"
+token = os.getenv("BLOCKCYPHER_TOKEN")
+API_BASE = "https://api.blockcypher.com/v1/btc/main"
+
+def build_address_url(address, limit=50):
+    """
+    주소 전체 트랜잭션 조회 URL 생성 (토큰은 설정된 경우에만 추가)
+    """
+    url = f"{API_BASE}/addrs/{address}/full?limit={limit}"
+    if token:
+        url += f"&token={token}"
+    return url
+
+def build_tx_url(tx_hash, limit=50):
+    """
+    단일 트랜잭션 조회 URL 생성 (outputs 최대 limit개)
+    """
+    url = f"{API_BASE}/txs/{tx_hash}?limit={limit}"
+    if token:
+        url += f"&token={token}"
+    return url
 
 def get_transactions(address, limit=50):
     """
     주어진 비트코인 주소의 전체 트랜잭션 리스트 (inputs/outputs 포함)를 BlockCypher API로부터 가져옴
     네트워크 시각화에 필요한 구조를 포함함
+    - 실제 호출/녹화/재생 여부는 http_transport 모드(BTC_HTTP_MODE)를 따름
     """
-    url = f"https://api.blockcypher.com/v1/btc/main/addrs/{address}/full?limit={limit}&token={token}"
+    url = build_address_url(address, limit)
 
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
+        data = http_get_json(url)
         return data  # 전체 응답 반환
     except Exception as e:
         st.error(f"🚨 전체 트랜잭션 API 호출 실패: {e}")
         return {}
 
+def build_block_txrefs_url(address, block_height, limit=2000):
+    """
+    주소의 특정 블록 거래 목록(txref, 해시만) 조회 URL
+    """
+    url = f"{API_BASE}/addrs/{address}?after={block_height - 1}&before={block_height + 1}&limit={limit}"
+    if token:
+        url += f"&token={token}"
+    return url
+
+def _block_fallback(address, block_height, seen, page_size, stats):
+    """
+    한 블록이 페이지 전체를 채워 before 페이지네이션으로 넘어갈 수 없을 때
+    - 해당 블록의 txref 목록을 받아 아직 받지 않은 tx만 해시 단위로 조회, page_size개씩 묶어 반환
+    - txref 목록이 잘렸거나 조회에 실패한 tx가 있으면 stats의 incomplete_blocks / missing_txs에 기록
+    """
+    stats['block_fallbacks'] += 1
+    refs = http_get_json(build_block_txrefs_url(address, block_height))
+    hashes = list(dict.fromkeys(
+        ref.get("tx_hash") for ref in refs.get("txrefs", [])
+        if ref.get("block_height") == block_height and ref.get("tx_hash") not in seen
+    ))
+    missing = 1 if refs.get("hasMore") else 0
+    batch = []
+    for tx_hash in hashes:
+        try:
+            batch.append(http_get_json(build_tx_url(tx_hash)))
+        except Exception:
+            missing += 1
+            continue
+        if len(batch) >= page_size:
+            yield {"address": address, "txs": batch}
+            batch = []
+    if batch:
+        yield {"address": address, "txs": batch}
+    if missing:
+        stats['incomplete_blocks'] += 1
+        stats['missing_txs'] += missing
+
+def iter_transaction_pages(address, page_size=50, max_pages=None, stats=None):
+    """
+    주소의 전체 거래를 페이지 단위로 순회 (최신 → 과거, before=블록 높이 기반 페이지네이션)
+    - 한 번에 한 페이지 JSON만 메모리에 유지
+    - 페이지 경계에 걸친 블록은 다시 조회하고 이미 받은 tx_hash는 제외
+    - 한 블록이 페이지 전체를 채우면 txref 목록 + 해시별 조회로 그 블록의 나머지를 받음
+    - stats(dict)를 넘기면 pages / block_fallbacks / incomplete_blocks / missing_txs 기록
+      (incomplete_blocks > 0이면 일부 이력이 빠진 결과)
+    """
+    if stats is None:
+        stats = {}
+    for key in ('pages', 'block_fallbacks', 'incomplete_blocks', 'missing_txs'):
+        stats.setdefault(key, 0)
+
+    # boundary: edge 높이 블록에서 이미 반환한 tx_hash
+    before, edge, boundary = None, None, set()
+    while max_pages is None or stats['pages'] < max_pages:
+        url = build_address_url(address, page_size)
+        if before is not None:
+            url += f"&before={before}"
+        page = http_get_json(url)
+        txs = [tx for tx in page.get("txs", []) if tx.get("hash") not in boundary]
+        stats['pages'] += 1
+        if txs:
+            yield {**page, "txs": txs}
+        if not page.get("hasMore") or not page.get("txs"):
+            return
+
+        heights = [tx.get("block_height", -1) for tx in page["txs"] if tx.get("block_height", -1) >= 0]
+        if not heights:
+            return
+        lowest = min(heights)
+        at_lowest = {tx.get("hash") for tx in page["txs"] if tx.get("block_height") == lowest}
+        boundary = boundary | at_lowest if lowest == edge else at_lowest
+        edge = lowest
+
+        if max(heights) == lowest:
+            # 페이지 전체가 한 블록: before로는 진행할 수 없으므로 블록 단위로 나머지 조회 후 다음 블록으로
+            yield from _block_fallback(address, lowest, boundary, page_size, stats)
+            before, edge, boundary = lowest, None, set()
+        else:
+            before = lowest + 1
+
+# 트랜잭션 형태 피처 (트랜잭션 단위 값, 같은 tx의 출력 행에 반복 저장)
+TX_FEATURE_COLUMNS = [
+    'input_value_btc', 'output_value_btc', 'fee_btc', 'fee_rate',
+    'fan_out_ratio', 'equal_output_n', 'equal_output_btc', 'coinjoin_flag'
+]
+
+
+def _satoshi(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def tx_shape_features(tx):
+    """
+    트랜잭션 1개의 형태 피처 + 출력별 잔돈(change) 추정
+    - 입력 합계: inputs의 output_value 합 (응답에서 입력 목록이 잘렸으면 NaN)
+    - 수수료율: fees / vsize (sat/vB, vsize가 없으면 size 기준)
+    - fan_out_ratio: 출력 수 / 입력 수 (vout_sz / vin_sz)
+    - 같은 금액 출력 히스토그램의 최빈값 개수가 COINJOIN_MIN_EQUAL_OUTPUTS 이상이고
+      입력 수가 그 이상이면 CoinJoin 후보
+    - 잔돈 추정 (우선순위 순):
+      · 입력 주소로 다시 돌아가는 출력
+      · CoinJoin이면 공통 금액이 아닌 출력 (0 sat OP_RETURN 출력 제외)
+      · 출력 2개일 때 입력과 스크립트 유형이 같은 쪽이 하나뿐이면 그 출력
+      · 출력 2개일 때 ROUND_VALUE_SATOSHI 단위로 딱 떨어지는 쪽이 하나뿐이면 나머지 출력
+    - 반환: (TX_FEATURE_COLUMNS dict, 출력 순서대로의 잔돈 여부 리스트)
+    """
+    inputs = tx.get("inputs") or []
+    outputs = tx.get("outputs") or []
+    vin_sz = tx.get("vin_sz") or len(inputs)
+    vout_sz = tx.get("vout_sz") or len(outputs)
+
+    in_values = [_satoshi(inp.get("output_value")) for inp in inputs]
+    input_total = sum(v for v in in_values if v is not None) \
+        if inputs and len(inputs) >= vin_sz and None not in in_values else None
+    out_values = [_satoshi(out.get("value")) for out in outputs]
+    output_total = sum(v for v in out_values if v is not None) if len(outputs) >= vout_sz else None
+
+    fees = _satoshi(tx.get("fees"))
+    if fees is None and input_total is not None and output_total is not None:
+        fees = input_total - output_total
+    size = tx.get("vsize") or tx.get("size")
+
+    # 같은 금액 출력 히스토그램 (0 sat 출력 = OP_RETURN 제외)
+    histogram = Counter(v for v in out_values if v)
+    equal_value, equal_n = histogram.most_common(1)[0] if histogram else (None, 0)
+    coinjoin = equal_n >= COINJOIN_MIN_EQUAL_OUTPUTS and vin_sz >= equal_n
+
+    input_addresses = {a for inp in inputs for a in (inp.get("addresses") or [])}
+    change = [bool(input_addresses.intersection(out.get("addresses") or [])) for out in outputs]
+    if not any(change):
+        if coinjoin:
+            change = [bool(v) and v != equal_value for v in out_values]
+        elif len(outputs) == 2:
+            input_types = {inp.get("script_type") for inp in inputs} - {None}
+            same_type = [len(input_types) == 1 and out.get("script_type") in input_types for out in outputs]
+            round_value = [v is not None and v % ROUND_VALUE_SATOSHI == 0 for v in out_values]
+            if sum(same_type) == 1:
+                change = same_type
+            elif sum(round_value) == 1:
+                change = [not r for r in round_value]
+
+    features = {
+        'input_value_btc': input_total / 1e8 if input_total is not None else float('nan'),
+        'output_value_btc': output_total / 1e8 if output_total is not None else float('nan'),
+        'fee_btc': fees / 1e8 if fees is not None else float('nan'),
+        'fee_rate': fees / size if fees is not None and size else float('nan'),
+        'fan_out_ratio': vout_sz / vin_sz if vin_sz else float('nan'),
+        'equal_output_n': equal_n,
+        'equal_output_btc': equal_value / 1e8 if equal_value is not None else float('nan'),
+        'coinjoin_flag': coinjoin,
+    }
+    return features, change
+
+
+def tx_feature_table(df):
+    """
+    출력 행 DataFrame에서 트랜잭션 단위 형태 피처 테이블 추출 (tx_hash당 1행)
+    """
+    columns = ['tx_hash', 'confirmed', 'tx_input_n', 'tx_output_n'] + TX_FEATURE_COLUMNS
+    if df.empty or 'coinjoin_flag' not in df.columns:
+        return pd.DataFrame(columns=columns)
+    return df.drop_duplicates('tx_hash')[columns].reset_index(drop=True)
+
+
 def parse_blockcypher_transactions(raw_json):
     """
     BlockCypher에서 받은 txs 리스트(JSON)를 DataFrame으로 변환
@@ -33,6 +221,7 @@ def parse_blockcypher_transactions(raw_json):
     - tx_hash: 트랜잭션 해시
     - btc_value: 전송 금액 (BTC 기준)
     - address: 수신 주소
+    - 같은 순회에서 트랜잭션 형태 피처(TX_FEATURE_COLUMNS)와 출력별 change_flag도 함께 계산
     """
 
     if not isinstance(raw_json, dict) or "txs" not in raw_json:
@@ -47,8 +236,9 @@ def parse_blockcypher_transactions(raw_json):
         tx_hash = tx.get("hash")
         confirmed = str(tx.get("confirmed")) if tx.get("confirmed") else None
         outputs = tx.get("outputs", [])
+        features, change = tx_shape_features(tx)
 
-        for out in outputs:
+        for i, out in enumerate(outputs):
             address_list = out.get("addresses") or []
             address = address_list[0] if address_list else None
 
@@ -67,7 +257,9 @@ def parse_blockcypher_transactions(raw_json):
                 "address": address,
                 "tx_input_n": tx.get("vin_sz"),
                 "tx_output_n": tx.get("vout_sz"),
-                "spent": out.get("spent_by", None)
+                "spent": out.get("spent_by", None),
+                **features,
+                "change_flag": change[i]
             })
 
     return pd.DataFrame(tx_list)
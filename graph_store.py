@@ -0,0 +1,531 @@
+# 주소 ↔ 트랜잭션 인접 관계 영구 저장소 (memory-mapped CSR + append-only 로그)
+
+import json
+import os
+import shutil
+import threading
+import uuid
+import numpy as np
+import pandas as pd
+
+from config import GRAPH_STORE_DIR, GRAPH_COMPACT_TAIL, GRAPH_COMPACT_CHUNK
+
+# 간선 레코드: spend = 주소 → 트랜잭션 (입력), pay = 트랜잭션 → 주소 (출력), value는 사토시
+EDGE_DTYPE = np.dtype([('src', '<i8'), ('dst', '<i8'), ('value', '<i8')])
+EDGE_KINDS = ('spend', 'pay')
+
+
+def _hash_keys(keys):
+    return pd.util.hash_array(np.asarray(keys, dtype=object).astype(str))
+
+
+def _create_npy(path, dtype, n):
+    # n개짜리 .npy를 디스크에 만들고 memmap으로 반환 (빈 배열은 mmap할 수 없으므로 바로 저장)
+    if n == 0:
+        np.save(path, np.empty(0, dtype=dtype))
+        return np.empty(0, dtype=dtype)
+    return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(n,))
+
+
+def _merge_csr(old, tail_keys, tail_others, tail_values, n, prefix, chunk=GRAPH_COMPACT_CHUNK):
+    """
+    기존 CSR + 로그 꼬리 간선 → 새 CSR 파일 (prefix_indptr / _indices / _values .npy)
+    - 노드별 간선 순서: 기존 간선 다음 꼬리 간선 (전체 로그를 안정 정렬한 결과와 같음)
+    - 정렬은 꼬리만, 기존 indices/values는 memmap에서 chunk개씩 새 위치로 복사
+    """
+    if old is None:
+        old_indptr = np.zeros(1, dtype=np.int64)
+        old_indices = old_values = np.empty(0, dtype=np.int64)
+    else:
+        old_indptr, old_indices, old_values = old
+        old_indptr = np.asarray(old_indptr)
+    ext = np.full(n + 1, old_indptr[-1], dtype=np.int64)
+    ext[:len(old_indptr)] = old_indptr
+
+    order = np.argsort(tail_keys, kind='mergesort')
+    tail_cum = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tail_keys, minlength=n), out=tail_cum[1:])
+    indptr = ext + tail_cum
+    np.save(prefix + "_indptr.npy", indptr)
+
+    indices = _create_npy(prefix + "_indices.npy", np.int64, int(indptr[-1]))
+    values = _create_npy(prefix + "_values.npy", np.int64, int(indptr[-1]))
+    old_total = int(old_indptr[-1])
+    for start in range(0, old_total, chunk):
+        pos = np.arange(start, min(start + chunk, old_total))
+        new_pos = pos + tail_cum[np.searchsorted(old_indptr, pos, side='right') - 1]
+        indices[new_pos] = old_indices[pos[0]:pos[-1] + 1]
+        values[new_pos] = old_values[pos[0]:pos[-1] + 1]
+    # 꼬리 간선: 노드 u의 기존 간선 끝(ext[u + 1]) + 정렬된 꼬리에서의 위치
+    new_pos = ext[tail_keys[order] + 1] + np.arange(len(order))
+    indices[new_pos] = tail_others[order]
+    values[new_pos] = tail_values[order]
+    for array in (indices, values):
+        if isinstance(array, np.memmap):
+            array.flush()
+
+
+class _StringTable:
+    """
+    append-only 문자열 사전 (주소 또는 tx_hash ↔ 정수 id)
+    - 문자열 본문/끝 오프셋/해시는 파일에 이어 쓰고 memmap으로 조회
+    - 해시 → id 조회는 compact 시 세대 디렉터리에 저장한 정렬 인덱스 + 이후 추가분 dict
+    """
+
+    def __init__(self, root, name):
+        self.name = name
+        self.str_path = os.path.join(root, f"{name}_str.bin")
+        self.off_path = os.path.join(root, f"{name}_off.u64")
+        self.hash_path = os.path.join(root, f"{name}_hash.u64")
+        for path in (self.str_path, self.off_path, self.hash_path):
+            open(path, "ab").close()
+
+        self.size = os.path.getsize(self.off_path) // 8
+        self.load_index(None)
+
+    def _index_paths(self, index_dir):
+        return (os.path.join(index_dir, f"{self.name}_sorted_hash.npy"),
+                os.path.join(index_dir, f"{self.name}_sorted_id.npy"))
+
+    def load_index(self, index_dir):
+        """
+        세대 디렉터리의 정렬 인덱스를 열고, 인덱스 이후 추가분은 dict로 다시 구성
+        """
+        hash_path, id_path = self._index_paths(index_dir) if index_dir else (None, None)
+        if hash_path and os.path.exists(hash_path):
+            self._sorted_hash = np.load(hash_path, mmap_mode='r')
+            self._sorted_id = np.load(id_path, mmap_mode='r')
+        else:
+            self._sorted_hash = np.empty(0, dtype=np.uint64)
+            self._sorted_id = np.empty(0, dtype=np.int64)
+        self._indexed = len(self._sorted_hash)
+        self._recent = {}
+        hashes = self._hashes()
+        for i in range(self._indexed, self.size):
+            self._recent[int(hashes[i])] = i
+
+    def _hashes(self):
+        if self.size == 0:
+            return np.empty(0, dtype=np.uint64)
+        return np.memmap(self.hash_path, dtype=np.uint64, mode='r', shape=(self.size,))
+
+    def lookup(self, keys):
+        """
+        문자열 배열 → id 배열 (없으면 -1)
+        """
+        hashes = _hash_keys(keys)
+        ids = np.full(len(hashes), -1, dtype=np.int64)
+        if self._indexed:
+            pos = np.searchsorted(self._sorted_hash, hashes)
+            pos = np.minimum(pos, self._indexed - 1)
+            found = self._sorted_hash[pos] == hashes
+            ids[found] = self._sorted_id[pos[found]]
+        for i in np.flatnonzero(ids < 0):
+            ids[i] = self._recent.get(int(hashes[i]), -1)
+        return ids
+
+    def get_or_add(self, keys):
+        """
+        문자열 배열 → id 배열 (없는 문자열은 새 id로 추가)
+        """
+        ids = self.lookup(keys)
+        missing = np.flatnonzero(ids < 0)
+        if missing.size == 0:
+            return ids
+
+        new_keys = {}
+        for i in missing:
+            key = str(keys[i])
+            if key not in new_keys:
+                new_keys[key] = self.size + len(new_keys)
+            ids[i] = new_keys[key]
+
+        encoded = [k.encode() for k in new_keys]
+        base = os.path.getsize(self.str_path)
+        ends = base + np.cumsum([len(b) for b in encoded], dtype=np.uint64)
+        hashes = _hash_keys(list(new_keys))
+        with open(self.str_path, "ab") as f:
+            f.write(b"".join(encoded))
+        with open(self.off_path, "ab") as f:
+            f.write(ends.astype(np.uint64).tobytes())
+        with open(self.hash_path, "ab") as f:
+            f.write(hashes.tobytes())
+
+        for h, i in zip(hashes, new_keys.values()):
+            self._recent[int(h)] = i
+        self.size += len(new_keys)
+        return ids
+
+    def names(self, ids):
+        """
+        id 배열 → 문자열 리스트
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if ids.size == 0:
+            return []
+        ends = np.memmap(self.off_path, dtype=np.uint64, mode='r', shape=(self.size,))
+        data = np.memmap(self.str_path, dtype=np.uint8, mode='r')
+        result = []
+        for i in ids:
+            start = int(ends[i - 1]) if i > 0 else 0
+            result.append(bytes(data[start:int(ends[i])]).decode())
+        return result
+
+    def write_index(self, index_dir, size, chunk=GRAPH_COMPACT_CHUNK):
+        """
+        id < size 전체의 해시 정렬 인덱스를 새 세대 디렉터리에 기록 (사용 중인 인덱스 파일은 건드리지 않음)
+        - 기존 정렬 인덱스 이후 추가분만 정렬해 병합, 기존 인덱스는 memmap에서 chunk개씩 복사
+        """
+        old_hash, old_id, indexed = self._sorted_hash, self._sorted_id, self._indexed
+        fresh = np.asarray(np.memmap(self.hash_path, dtype=np.uint64, mode='r', shape=(size,))[indexed:]) \
+            if size > indexed else np.empty(0, dtype=np.uint64)
+        order = np.argsort(fresh, kind='mergesort')
+        new_hash = fresh[order]
+
+        hash_path, id_path = self._index_paths(index_dir)
+        out_hash = _create_npy(hash_path, np.uint64, size)
+        out_id = _create_npy(id_path, np.int64, size)
+        # 같은 해시는 기존 항목이 앞 (기존: 앞선 새 항목 수만큼, 새 항목: 앞선 기존 항목 수만큼 밀림)
+        new_pos = np.searchsorted(old_hash, new_hash, side='right') + np.arange(len(new_hash))
+        out_hash[new_pos] = new_hash
+        out_id[new_pos] = order + indexed
+        for start in range(0, indexed, chunk):
+            block = np.asarray(old_hash[start:start + chunk])
+            pos = np.arange(start, start + len(block)) + np.searchsorted(new_hash, block, side='left')
+            out_hash[pos] = block
+            out_id[pos] = old_id[start:start + chunk]
+        for array in (out_hash, out_id):
+            if isinstance(array, np.memmap):
+                array.flush()
+
+
+class GraphStore:
+    """
+    주소 ↔ 트랜잭션 이분 그래프 저장소
+    - 간선은 append-only 로그(spend.log / pay.log)에 추가
+    - compact()가 로그를 정방향/역방향 CSR(indptr, indices, values .npy)로 정리
+      · 기존 CSR에 새 로그 꼬리만 정렬해 병합 (전체 로그를 다시 정렬/적재하지 않음)
+      · 새 세대 디렉터리(csr-*)에 CSR/문자열 인덱스를 모두 쓴 뒤 meta.json 교체 한 번으로 전환
+      · 중간에 중단돼도 meta.json은 이전 세대를 가리키므로 간선이 중복 조회되지 않음
+      · 병합 중에는 저장소 잠금을 잡지 않으므로 다른 세션의 추가/조회는 이전 세대 + 꼬리로 계속 동작
+    - maybe_compact()는 백그라운드 스레드로 compact를 시작하고 바로 반환 (요청 경로에서 대기하지 않음)
+    - 조회는 memmap CSR + 아직 정리되지 않은 로그 꼬리만 읽음 (전체 그래프를 힙에 올리지 않음)
+    - 한 프로세스 안에서는 스레드 안전, 여러 프로세스가 동시에 쓰는 것은 지원하지 않음
+    """
+
+    def __init__(self, root=GRAPH_STORE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._compactor = None
+        self.last_compact_error = None
+        self.addresses = _StringTable(root, "addr")
+        self.txs = _StringTable(root, "tx")
+        for kind in EDGE_KINDS:
+            open(self._log_path(kind), "ab").close()
+        self._meta_path = os.path.join(root, "meta.json")
+        self._load_csr()
+
+    def _log_path(self, kind):
+        return os.path.join(self.root, f"{kind}.log")
+
+    def _generation_dir(self):
+        generation = self.meta.get('generation')
+        return os.path.join(self.root, generation) if generation else None
+
+    def _load_csr(self):
+        self.meta = {kind: 0 for kind in EDGE_KINDS}
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                self.meta.update(json.load(f))
+
+        self._csr = {}
+        gen_dir = self._generation_dir()
+        if gen_dir is not None:
+            for kind in EDGE_KINDS:
+                for direction in ('fwd', 'rev'):
+                    prefix = os.path.join(gen_dir, f"{kind}_{direction}")
+                    self._csr[(kind, direction)] = tuple(
+                        np.load(f"{prefix}_{part}.npy", mmap_mode='r') for part in ('indptr', 'indices', 'values')
+                    )
+        self.addresses.load_index(gen_dir)
+        self.txs.load_index(gen_dir)
+
+        # 전환 전에 중단된 세대 디렉터리 정리
+        current = self.meta.get('generation')
+        for name in os.listdir(self.root):
+            if name.startswith("csr-") and name != current:
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+    def _log(self, kind, start=0):
+        count = os.path.getsize(self._log_path(kind)) // EDGE_DTYPE.itemsize
+        if count <= start:
+            return np.empty(0, dtype=EDGE_DTYPE)
+        return np.memmap(self._log_path(kind), dtype=EDGE_DTYPE, mode='r', offset=start * EDGE_DTYPE.itemsize,
+                         shape=(count - start,))
+
+    def add_transactions(self, tx_list):
+        """
+        BlockCypher txs 리스트를 그래프에 추가 (이미 저장된 tx_hash는 건너뜀)
+        - 반환: 새로 추가된 트랜잭션 수
+        """
+        with self._lock:
+            txs = [tx for tx in tx_list or [] if tx.get("hash")]
+            if not txs:
+                return 0
+            hashes = [tx["hash"] for tx in txs]
+            known = self.txs.lookup(hashes) >= 0
+            _, first = np.unique(hashes, return_index=True)
+            fresh = [txs[i] for i in sorted(first) if not known[i]]
+            if not fresh:
+                return 0
+
+            tx_ids = self.txs.get_or_add([tx["hash"] for tx in fresh])
+            rows = {kind: ([], [], []) for kind in EDGE_KINDS}
+            for tx_id, tx in zip(tx_ids, fresh):
+                for i in tx.get("inputs", []):
+                    addr_list = i.get("addresses") or []
+                    if addr_list:
+                        rows['spend'][0].append(addr_list[0])
+                        rows['spend'][1].append(tx_id)
+                        rows['spend'][2].append(i.get("output_value", 0) or 0)
+                for o in tx.get("outputs", []):
+                    addr_list = o.get("addresses") or []
+                    if addr_list:
+                        rows['pay'][0].append(addr_list[0])
+                        rows['pay'][1].append(tx_id)
+                        rows['pay'][2].append(o.get("value", 0) or 0)
+
+            for kind, (addrs, ids, values) in rows.items():
+                if not addrs:
+                    continue
+                addr_ids = self.addresses.get_or_add(addrs)
+                records = np.empty(len(addrs), dtype=EDGE_DTYPE)
+                if kind == 'spend':
+                    records['src'], records['dst'] = addr_ids, ids
+                else:
+                    records['src'], records['dst'] = ids, addr_ids
+                records['value'] = values
+                with open(self._log_path(kind), "ab") as f:
+                    f.write(records.tobytes())
+            return len(fresh)
+
+    def tail_size(self):
+        """
+        아직 CSR로 정리되지 않은 간선 로그 레코드 수
+        """
+        return sum(len(self._log(kind, self.meta.get(kind, 0))) for kind in EDGE_KINDS)
+
+    def maybe_compact(self, max_tail=GRAPH_COMPACT_TAIL, background=True):
+        """
+        로그 꼬리가 max_tail을 넘으면 compact() 실행 (조회 시 선형 스캔 구간을 제한)
+        - background=True면 데몬 스레드에서 실행하고 바로 반환 (이미 실행 중이면 건너뜀)
+        - 반환: compact를 시작(또는 실행)했는지 여부
+        """
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return False
+            if self.tail_size() <= max_tail:
+                return False
+            if background:
+                self._compactor = threading.Thread(target=self._compact_in_background, name="graph-compact",
+                                                   daemon=True)
+                self._compactor.start()
+                return True
+        self.compact()
+        return True
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+            self.last_compact_error = None
+        except Exception as e:
+            # 새 세대는 전환되지 않았으므로 조회에는 영향 없음, 다음 maybe_compact에서 다시 시도
+            self.last_compact_error = e
+
+    def compact(self):
+        """
+        기존 CSR + 로그 꼬리 → 새 세대 CSR (정방향 src → dst / 역방향 dst → src)
+        - 시작 시점의 로그 끝/사전 크기까지만 정리, 이후 추가분은 다음 compact의 꼬리
+        - 새 세대 디렉터리에 쓰고 meta.json을 원자적으로 교체한 뒤 이전 세대 삭제
+        - 병합하는 동안에는 저장소 잠금을 잡지 않음 (조회는 이전 세대로 계속 동작)
+        """
+        with self._compact_lock:
+            with self._lock:
+                csr = dict(self._csr)
+                starts = {kind: self.meta.get(kind, 0) for kind in EDGE_KINDS}
+                ends = {kind: os.path.getsize(self._log_path(kind)) // EDGE_DTYPE.itemsize for kind in EDGE_KINDS}
+                sizes = {'addr': self.addresses.size, 'tx': self.txs.size}
+
+            generation = f"csr-{uuid.uuid4().hex}"
+            gen_dir = os.path.join(self.root, generation)
+            os.makedirs(gen_dir)
+            try:
+                meta = {'generation': generation}
+                for kind in EDGE_KINDS:
+                    tail = np.asarray(self._log(kind, starts[kind])[:ends[kind] - starts[kind]])
+                    src_n = sizes['addr'] if kind == 'spend' else sizes['tx']
+                    dst_n = sizes['tx'] if kind == 'spend' else sizes['addr']
+                    for direction, key, other, n in (('fwd', 'src', 'dst', src_n), ('rev', 'dst', 'src', dst_n)):
+                        _merge_csr(csr.get((kind, direction)), tail[key], tail[other], tail['value'], n,
+                                   os.path.join(gen_dir, f"{kind}_{direction}"))
+                    meta[kind] = ends[kind]
+                self.addresses.write_index(gen_dir, sizes['addr'])
+                self.txs.write_index(gen_dir, sizes['tx'])
+                for name in os.listdir(gen_dir):
+                    with open(os.path.join(gen_dir, name), "rb+") as f:
+                        os.fsync(f.fileno())
+            except BaseException:
+                shutil.rmtree(gen_dir, ignore_errors=True)
+                raise
+
+            with self._lock:
+                tmp_path = self._meta_path + ".tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(meta, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self._meta_path)
+                self._load_csr()
+
+    def _neighbors(self, kind, direction, ids):
+        """
+        노드 id 배열의 이웃 (원본 인덱스, 이웃 id, 값) 배열 — CSR + 로그 꼬리 합산
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        owners, others, values = [], [], []
+        if ids.size == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty
+
+        csr = self._csr.get((kind, direction))
+        if csr is not None:
+            indptr, indices, vals = csr
+            covered = ids < len(indptr) - 1
+            starts = np.zeros(len(ids), dtype=np.int64)
+            ends = np.zeros(len(ids), dtype=np.int64)
+            starts[covered] = indptr[ids[covered]]
+            ends[covered] = indptr[ids[covered] + 1]
+            lengths = ends - starts
+            if lengths.sum():
+                pos = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+                owners.append(np.repeat(np.arange(len(ids)), lengths))
+                others.append(np.asarray(indices[pos]))
+                values.append(np.asarray(vals[pos]))
+
+        tail = self._log(kind, self.meta.get(kind, 0))
+        if len(tail):
+            key, other = ('src', 'dst') if direction == 'fwd' else ('dst', 'src')
+            order = np.argsort(ids)
+            sorted_ids = ids[order]
+            pos = np.searchsorted(sorted_ids, tail[key])
+            pos = np.minimum(pos, len(ids) - 1)
+            hit = sorted_ids[pos] == tail[key]
+            owners.append(order[pos[hit]])
+            others.append(np.asarray(tail[other][hit]))
+            values.append(np.asarray(tail['value'][hit]))
+
+        if not owners:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty
+        return np.concatenate(owners), np.concatenate(others), np.concatenate(values)
+
+    def _address_ids(self, addresses):
+        if isinstance(addresses, str):
+            addresses = [addresses]
+        ids = self.addresses.lookup(list(addresses))
+        return ids[ids >= 0]
+
+    def successors(self, address):
+        """
+        주소가 입력으로 참여한 트랜잭션의 출력 주소 (주소, tx_hash, 사토시) DataFrame
+        """
+        return self._hop(address, 'out')
+
+    def predecessors(self, address):
+        """
+        주소로 출력을 보낸 트랜잭션의 입력 주소 (주소, tx_hash, 사토시) DataFrame
+        """
+        return self._hop(address, 'in')
+
+    def _hop(self, address, direction):
+        with self._lock:
+            ids = self._address_ids(address)
+            first, second = (('spend', 'fwd'), ('pay', 'fwd')) if direction == 'out' else (('pay', 'rev'), ('spend', 'rev'))
+            _, tx_ids, _ = self._neighbors(*first, ids)
+            tx_ids = np.unique(tx_ids)
+            owner, addr_ids, values = self._neighbors(*second, tx_ids)
+            return pd.DataFrame({
+                'address': self.addresses.names(addr_ids),
+                'tx_hash': self.txs.names(tx_ids[owner]),
+                'value': values,
+            })
+
+    def degree_stats(self, address):
+        """
+        주소 1건의 차수 통계
+        - out_tx / in_tx: 입력·출력으로 참여한 트랜잭션 수
+        - out_value / in_value: 입력으로 보낸 / 출력으로 받은 사토시 합계
+        """
+        with self._lock:
+            ids = self._address_ids(address)
+            _, out_tx, out_val = self._neighbors('spend', 'fwd', ids)
+            _, in_tx, in_val = self._neighbors('pay', 'rev', ids)
+            return {
+                'out_tx': int(np.unique(out_tx).size),
+                'in_tx': int(np.unique(in_tx).size),
+                'out_value': int(out_val.sum()),
+                'in_value': int(in_val.sum()),
+            }
+
+    def k_hop(self, address, k=2, direction='out', max_nodes=100000):
+        """
+        주소에서 k단계 이내에 도달하는 주소 집합 (BFS, 단계별로 frontier만 메모리에 유지)
+        - direction: 'out' (자금 흐름 방향) | 'in' (역방향)
+        - 반환: address / hop DataFrame (시작 주소는 hop 0)
+        """
+        with self._lock:
+            first, second = (('spend', 'fwd'), ('pay', 'fwd')) if direction == 'out' else (('pay', 'rev'), ('spend', 'rev'))
+            frontier = np.unique(self._address_ids(address))
+            visited = frontier
+            layers = [frontier]
+            for _ in range(k):
+                if frontier.size == 0 or visited.size >= max_nodes:
+                    break
+                _, tx_ids, _ = self._neighbors(*first, frontier)
+                _, addr_ids, _ = self._neighbors(*second, np.unique(tx_ids))
+                frontier = np.setdiff1d(addr_ids, visited)[:max_nodes - visited.size]
+                visited = np.union1d(visited, frontier)
+                layers.append(frontier)
+
+            ids = np.concatenate(layers)
+            return pd.DataFrame({
+                'address': self.addresses.names(ids),
+                'hop': np.repeat(np.arange(len(layers)), [len(layer) for layer in layers]),
+            })
+
+    def address_edges(self, address):
+        """
+        주소가 참여한 트랜잭션들의 송신자 → 수신자 간선 리스트
+        - visualize.extract_edges_from_tx_list와 같은 (sender, receiver, value) 형식
+        """
+        with self._lock:
+            ids = self._address_ids(address)
+            _, spent, _ = self._neighbors('spend', 'fwd', ids)
+            _, received, _ = self._neighbors('pay', 'rev', ids)
+            tx_ids = np.unique(np.concatenate([spent, received]))
+
+            s_owner, senders, _ = self._neighbors('spend', 'rev', tx_ids)
+            r_owner, receivers, values = self._neighbors('pay', 'fwd', tx_ids)
+            s_names = self.addresses.names(senders)
+            r_names = self.addresses.names(receivers)
+
+            by_tx = {}
+            for owner, name in zip(s_owner, s_names):
+                by_tx.setdefault(owner, []).append(name)
+            edges = []
+            for owner, receiver, value in zip(r_owner, r_names, values):
+                for sender in by_tx.get(owner, []):
+                    edges.append((sender, receiver, int(value)))
+            return edges
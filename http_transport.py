@@ -0,0 +1,243 @@
+# HTTP 전송 계층: live / record / replay 모드 + 로컬 replay 서버
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import requests
+
+# 모드 설정 (환경변수 또는 configure()로 변경)
+# - live: 실제 API 호출
+# - record: 실제 API 호출 + 응답을 압축 코퍼스로 저장
+# - replay: 로컬 replay 서버(replay_url)로 요청을 보냄
+SETTINGS = {
+    'mode': os.getenv("BTC_HTTP_MODE", "live"),
+    'corpus_dir': os.getenv("BTC_HTTP_CORPUS", "data/http_corpus"),
+    'replay_url': os.getenv("BTC_REPLAY_URL", "http://127.0.0.1:8765"),
+    'timeout': 30,
+    'max_retries': 2,
+}
+
+# 코퍼스 키에서 제외할 쿼리 파라미터 (토큰은 저장하지 않음)
+SECRET_PARAMS = {'token'}
+
+_local = threading.local()
+
+
+def configure(**kwargs):
+    """
+    전송 계층 설정 변경 (예: configure(mode='replay', replay_url='http://127.0.0.1:9000'))
+    """
+    unknown = set(kwargs) - set(SETTINGS)
+    if unknown:
+        raise ValueError(f"❗ 알 수 없는 설정입니다: {sorted(unknown)}")
+    if kwargs.get('mode', SETTINGS['mode']) not in ('live', 'record', 'replay'):
+        raise ValueError(f"❗ 지원하지 않는 모드입니다: {kwargs['mode']}")
+    SETTINGS.update(kwargs)
+
+
+def _session():
+    # requests.Session은 스레드 간 공유가 안전하지 않으므로 스레드별로 유지
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        _local.session = session
+    return session
+
+
+def request_key(path_and_query):
+    """
+    경로+쿼리에서 비밀 파라미터를 제거하고 정렬한 정규화 키 (코퍼스 파일명 기준)
+    """
+    parts = urlsplit(path_and_query)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query) if k not in SECRET_PARAMS)
+    normalized = parts.path + ("?" + urlencode(query) if query else "")
+    return normalized, hashlib.sha1(normalized.encode()).hexdigest()
+
+
+def _corpus_path(digest, corpus_dir):
+    return os.path.join(corpus_dir, digest[:2], f"{digest}.json.gz")
+
+
+def record_response(url, status, body, corpus_dir=None):
+    """
+    응답 1건을 gzip JSON으로 코퍼스에 저장 (토큰 제외 URL 기준)
+    """
+    corpus_dir = corpus_dir or SETTINGS['corpus_dir']
+    parts = urlsplit(url)
+    normalized, digest = request_key(parts.path + ("?" + parts.query if parts.query else ""))
+    path = _corpus_path(digest, corpus_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    tmp_path = path + ".tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump({'request': normalized, 'status': status, 'body': body}, f)
+    os.replace(tmp_path, path)
+
+
+def load_recorded(path_and_query, corpus_dir=None):
+    """
+    코퍼스에서 응답 1건 조회 (없으면 None)
+    """
+    corpus_dir = corpus_dir or SETTINGS['corpus_dir']
+    _, digest = request_key(path_and_query)
+    path = _corpus_path(digest, corpus_dir)
+    if not os.path.exists(path):
+        return None
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _replay_target(url):
+    parts = urlsplit(url)
+    return SETTINGS['replay_url'].rstrip("/") + parts.path + ("?" + parts.query if parts.query else "")
+
+
+def http_get_json(url):
+    """
+    모드에 맞게 GET 요청을 보내고 JSON 응답 반환
+    - 429 응답은 Retry-After만큼 대기 후 max_retries회까지 재시도
+    - 그 외 HTTP 오류는 requests 예외로 그대로 전달
+    """
+    mode = SETTINGS['mode']
+    target = _replay_target(url) if mode == 'replay' else url
+
+    for attempt in range(SETTINGS['max_retries'] + 1):
+        response = _session().get(target, timeout=SETTINGS['timeout'])
+        if response.status_code != 429 or attempt == SETTINGS['max_retries']:
+            break
+        retry_after = response.headers.get("Retry-After")
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = 0.5 * (2 ** attempt)
+        time.sleep(delay)
+
+    response.raise_for_status()
+    data = response.json()
+
+    if mode == 'record':
+        record_response(url, response.status_code, data)
+    return data
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """
+    코퍼스 응답을 돌려주는 로컬 대체 서버 핸들러
+    - 지연: latency_ms ± jitter_ms
+    - error_rate 확률로 500, rate_limit_rate 확률로 429(Retry-After) 응답
+    """
+    corpus_dir = None
+    latency_ms = 0.0
+    jitter_ms = 0.0
+    error_rate = 0.0
+    rate_limit_rate = 0.0
+    retry_after = 1
+    rng = random.Random()
+    _cache = {}
+    _cache_lock = threading.Lock()
+
+    def _load(self):
+        _, digest = request_key(self.path)
+        with self._cache_lock:
+            if digest in self._cache:
+                return self._cache[digest]
+        record = load_recorded(self.path, self.corpus_dir)
+        with self._cache_lock:
+            self._cache[digest] = record
+        return record
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        delay = self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+        roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            self._send_json(429, {'error': 'Limits reached.'}, {'Retry-After': str(self.retry_after)})
+            return
+        if roll < self.rate_limit_rate + self.error_rate:
+            self._send_json(500, {'error': 'Injected error.'})
+            return
+
+        record = self._load()
+        if record is None:
+            self._send_json(404, {'error': 'Not recorded.'})
+            return
+        self._send_json(record.get('status', 200), record['body'])
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_replay_server(corpus_dir=None, host="127.0.0.1", port=8765, latency_ms=0.0,
+                        jitter_ms=0.0, error_rate=0.0, rate_limit_rate=0.0, retry_after=1, seed=None):
+    """
+    replay 서버를 백그라운드 스레드로 시작하고 서버 객체 반환
+    - port=0이면 빈 포트 자동 할당 (server.server_address로 확인)
+    - 종료: server.shutdown()
+    """
+    handler = type("ConfiguredReplayHandler", (ReplayHandler,), {
+        'corpus_dir': corpus_dir or SETTINGS['corpus_dir'],
+        'latency_ms': latency_ms,
+        'jitter_ms': jitter_ms,
+        'error_rate': error_rate,
+        'rate_limit_rate': rate_limit_rate,
+        'retry_after': retry_after,
+        'rng': random.Random(seed),
+        '_cache': {},
+        '_cache_lock': threading.Lock(),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="녹화된 BlockCypher 응답을 제공하는 로컬 replay 서버")
+    parser.add_argument("--corpus", default=SETTINGS['corpus_dir'])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = start_replay_server(
+        corpus_dir=args.corpus, host=args.host, port=args.port,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after, seed=args.seed
+    )
+    print(f"replay server listening on http://{args.host}:{server.server_address[1]} (corpus: {args.corpus})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# 오프라인 부하 테스트: replay 서버 기반 fetch → parse → score 파이프라인 처리량/지연 측정
+
+import argparse
+import gzip
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import numpy as np
+
+import http_transport
+from http_transport import http_get_json, start_replay_server
+from fetch_data import build_address_url, parse_blockcypher_transactions
+from pipeline import run_analysis
+
+
+def corpus_addresses(corpus_dir):
+    """
+    코퍼스에 녹화된 주소 목록 추출 (/addrs/<address>/full 요청 기준)
+    """
+    addresses = []
+    for root, _, files in os.walk(corpus_dir):
+        for name in files:
+            if not name.endswith(".json.gz"):
+                continue
+            with gzip.open(os.path.join(root, name), "rt", encoding="utf-8") as f:
+                request = json.load(f).get('request', "")
+            # 경로가 .../addrs/<address>/full 인 요청만 (txref·블록 조회 등 다른 녹화는 제외)
+            parts = urlsplit(request).path.rstrip("/").split("/")
+            if len(parts) >= 3 and parts[-3] == "addrs" and parts[-1] == "full" and parts[-2]:
+                addresses.append(parts[-2])
+    return sorted(set(addresses))
+
+
+def run_once(address, limit):
+    """
+    주소 1건 처리 후 단계별 소요 시간(초) 반환
+    """
+    timings = {}
+    t0 = time.perf_counter()
+    raw = http_get_json(build_address_url(address, limit))
+    t1 = time.perf_counter()
+    df = parse_blockcypher_transactions(raw)
+    t2 = time.perf_counter()
+    if not df.empty:
+        run_analysis(df)
+    t3 = time.perf_counter()
+    timings['fetch'] = t1 - t0
+    timings['parse'] = t2 - t1
+    timings['score'] = t3 - t2
+    timings['total'] = t3 - t0
+    return timings
+
+
+def summarize(samples, errors, wall):
+    """
+    단계별 p50/p95/p99 지연(ms)과 처리량 요약
+    """
+    summary = {
+        'requests': len(samples) + len(errors),
+        'ok': len(samples),
+        'errors': len(errors),
+        'wall_sec': round(wall, 3),
+        'throughput_rps': round(len(samples) / wall, 2) if wall > 0 else 0.0,
+    }
+    for stage in ('fetch', 'parse', 'score', 'total'):
+        values = np.array([s[stage] for s in samples]) * 1000.0
+        if values.size == 0:
+            continue
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        summary[stage] = {
+            'p50_ms': round(p50, 2),
+            'p95_ms': round(p95, 2),
+            'p99_ms': round(p99, 2),
+            'max_ms': round(values.max(), 2),
+        }
+    return summary
+
+
+def run_load_test(addresses, requests_total, concurrency, limit=50):
+    """
+    주소 목록을 순환하며 requests_total건을 concurrency개 워커로 실행
+    """
+    jobs = [addresses[i % len(addresses)] for i in range(requests_total)]
+    samples, errors = [], []
+
+    def job(address):
+        try:
+            return run_once(address, limit), None
+        except Exception as e:
+            return None, f"{address}: {type(e).__name__}: {e}"
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for timings, error in pool.map(job, jobs):
+            if error:
+                errors.append(error)
+            else:
+                samples.append(timings)
+    wall = time.perf_counter() - start
+    return summarize(samples, errors, wall), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="replay 코퍼스 기반 파이프라인 부하 테스트")
+    parser.add_argument("--corpus", default=http_transport.SETTINGS['corpus_dir'])
+    parser.add_argument("--addresses", nargs="*", help="대상 주소 (기본: 코퍼스 전체)")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    addresses = args.addresses or corpus_addresses(args.corpus)
+    if not addresses:
+        raise SystemExit(f"❗ 코퍼스에 녹화된 주소가 없습니다: {args.corpus} (BTC_HTTP_MODE=record로 먼저 녹화하세요)")
+
+    server = start_replay_server(
+        corpus_dir=args.corpus, port=0,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after, seed=args.seed
+    )
+    host, port = server.server_address[:2]
+    http_transport.configure(mode='replay', replay_url=f"http://{host}:{port}", corpus_dir=args.corpus)
+
+    try:
+        summary, errors = run_load_test(addresses, args.requests, args.concurrency, args.limit)
+    finally:
+        server.shutdown()
+
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    for error in errors[:10]:
+        print("error:", error)
+
+
+if __name__ == "__main__":
+    main()
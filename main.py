@@ -6,14 +6,9 @@ import os
 from dotenv import load_dotenv
 import streamlit as st
 import plotly.graph_objects as go
-from fetch_data import get_transactions , parse_blockcypher_transactions
+from fetch_data import get_transactions , parse_blockcypher_transactions, iter_transaction_pages
 from preprocess import preprocess
-from detect_patterns import detect_high_frequency, detect_high_amount, detect_tumbler_pattern, detect_extortion_pattern
-from calculate_score import (
-    score_high_frequency, score_high_amount,
-    score_tumbler, score_extortion,
-    calculate_total_score
-)
+from pipeline import run_analysis
 from pattern_identifier import (
     identify_ransomware_pattern,
     identify_sextortion_pattern,
@@ -26,14 +21,34 @@ from visualize import (
     plot_transaction_network,
     plot_mini_transaction_network
 )
-
-# ✅ 블랙리스트 불러오기
-def load_sanctioned_addresses(path="bitcoin_sanctioned_all.txt"):
-    try:
-        with open(path, "r") as f:
-            return set(line.strip() for line in f if line.strip())
-    except:
-        return set()
+from rollup import update_rollup, load_rollup
+from reference_stats import load_reference, update_reference, save_reference
+from graph_store import GraphStore
+from spend_tracer import trace_spend_chains
+from singleflight import fetch_flight, analysis_flight, data_version
+from chunked_pipeline import run_analysis_chunked
+from rule_engine import load_rules, evaluate_rules
+from sanctions import load_sanctioned, record_case, sanctioned_score
+from result_store import ResultStore, make_run_id, score_history
+
+# ✅ 블랙리스트 불러오기 (주소 → 출처 목록, config.SANCTION_SOURCES)
+def load_sanctioned_addresses():
+    return load_sanctioned()
+
+# ✅ 분석 결과 Parquet 저장소 (세션 간 공유, 배치 단위 기록)
+@st.cache_resource
+def get_result_store():
+    return ResultStore()
+
+# ✅ 전체 분석 주소 기준 참조 분포 (프로세스 전체에서 1회 로드 후 공유)
+@st.cache_resource
+def get_reference_stats():
+    return load_reference()
+
+# ✅ 주소 ↔ 트랜잭션 그래프 저장소 (프로세스 전체에서 공유)
+@st.cache_resource
+def get_graph_store():
+    return GraphStore()
 
 # ✅ 바 그래프 시각화
 def plot_score_bars(scores):
@@ -73,21 +88,6 @@ def plot_radar_chart(scores):
     )
     return fig
 
-# ✅ 이상 패턴 탐지 + 점수 계산 함수
-def run_analysis(df):
-    df = detect_high_frequency(df)
-    df = detect_high_amount(df)
-    df = detect_tumbler_pattern(df)
-    df = detect_extortion_pattern(df)
-
-    freq_score = score_high_frequency(df)
-    amount_score = score_high_amount(df)
-    tumbler_score = score_tumbler(df)
-    extortion_score = score_extortion(df)
-
-    total_score = calculate_total_score(freq_score, amount_score, tumbler_score, extortion_score)
-    return df, freq_score, amount_score, tumbler_score, extortion_score, total_score
-
 # ✅ Streamlit 시작
 st.set_page_config(page_title="Bitcoin Anomaly Detection Tool", layout="wide")
 st.image("signalLogo.png", width=360)
@@ -118,16 +118,52 @@ with st.expander("🛡 블랙리스트 출처 보기"):
 
 sanctioned = load_sanctioned_addresses()
 address = st.text_input("📡 분석할 비트코인 주소를 입력하세요")
+trace_chains = st.checkbox("🔗 spent_by 기반 peel chain 추적 (추가 API 호출 발생)")
+whale_mode = st.checkbox("🐋 대형 주소 청크 분석 (전체 거래 이력을 페이지 단위로 스트리밍, 점수만 계산)")
 if st.button("🔍 거래 흐름 분석 시작"):
     if not address or address.strip() == "":
         st.info("💡 주소를 입력한 후 '분석 시작'을 눌러주세요.")
     elif address in sanctioned:
         st.error("🚨 이 주소는 블랙리스트에 포함된 고위험 주소입니다.")
+        st.caption("출처: " + ", ".join(sanctioned[address]))
         st.warning("이 주소는 OFAC 등에서 확인된 위협 또는 제재 대상입니다.")
         st.metric("📌 최종 위험 점수", "100 / 100")
+    elif whale_mode:
+        try:
+            with st.spinner("⏳ 전체 거래 이력을 페이지 단위로 분석 중..."):
+                page_stats = {}
+                freq_score, amount_score, tumbler_score, extortion_score, total_score, summary = run_analysis_chunked(
+                    iter_transaction_pages(address, stats=page_stats), reference=get_reference_stats()
+                )
+                summary.update(page_stats)
+        except Exception as e:
+            st.error(f"🚨 청크 분석 실패: {e}")
+        else:
+            st.success(f"총 {summary['rows']}개 출력 · {summary['tx_events']}개 트랜잭션을 분석했습니다.")
+            if summary.get('incomplete_blocks'):
+                st.warning(f"⚠️ {summary['incomplete_blocks']}개 블록에서 트랜잭션 {summary['missing_txs']}건 이상을 받지 못해 "
+                           "일부 이력이 빠진 점수입니다.")
+            st.plotly_chart(plot_score_bars({
+                "고빈도": freq_score,
+                "고액 이상": amount_score,
+                "텀블러": tumbler_score,
+                "협박 사기": extortion_score
+            }), use_container_width=True)
+            st.metric("📌 참고용 위험 점수", f"{total_score} / 100")
+            st.code("\n".join(f"{k}: {v}" for k, v in summary.items()))
+
+            # ✅ 점수만 결과 저장소에 기록 (행 단위 결과 없음)
+            try:
+                get_result_store().append(address, None, {
+                    'freq_score': freq_score, 'amount_score': amount_score, 'tumbler_score': tumbler_score,
+                    'extortion_score': extortion_score, 'total_score': total_score,
+                }, make_run_id(address, f"chunked:{summary['rows']}:{summary['tx_events']}"))
+            except Exception as e:
+                st.warning(f"⚠️ 결과 저장 실패: {e}")
     else:
-        tx_json = get_transactions(address)
-        tx_list = get_transactions(address)
+        # 같은 주소를 동시에 분석하는 세션끼리는 한 번의 API 호출을 공유
+        tx_json = fetch_flight.do(('fetch', address), lambda: get_transactions(address), cache_if=bool)
+        tx_list = tx_json.get("txs", []) if isinstance(tx_json, dict) else []
         if not tx_list or "txs" not in tx_json:
             st.warning("❗ 트랜잭션을 불러오지 못했습니다. 주소를 다시 확인해주세요.")
         else:
@@ -180,7 +216,74 @@ if st.button("🔍 거래 흐름 분석 시작"):
             if df.empty:
                 st.error("❌ 전처리된 데이터프레임이 비어 있습니다. 파서 또는 입력 데이터에 문제가 있을 수 있습니다.")
             else:
-                df, freq_score, amount_score, tumbler_score, extortion_score, total_score = run_analysis(df)
+                reference = get_reference_stats()
+                # 같은 주소 + 같은 데이터 버전이면 분석 결과 공유 (공유 결과는 수정하지 않음)
+                analysis_key = ('analysis', address, data_version(tx_json))
+                df, freq_score, amount_score, tumbler_score, extortion_score, total_score = analysis_flight.do(
+                    analysis_key, lambda: run_analysis(df, reference=reference)
+                )
+
+                # ✅ 제재 주소와 직접 거래했으면 최소 점수 적용 (CLI 재검사와 같은 점수 정의로 기록/표시)
+                total_score, exposed = sanctioned_score(address, total_score, tx_json, sanctioned)
+                if exposed:
+                    st.error(f"🚨 제재 목록 주소 {len(exposed)}개와 직접 거래했습니다. "
+                             f"위험 점수를 최소 {total_score}점으로 반영합니다.")
+                    st.dataframe(pd.DataFrame({
+                        '상대 주소': sorted(exposed),
+                        '출처': [", ".join(sanctioned[addr]) for addr in sorted(exposed)],
+                    }))
+
+                # ✅ 시간 버킷 롤업 증분 갱신 (대시보드/저해상도 탐지용)
+                try:
+                    update_rollup(address, df)
+                except Exception as e:
+                    st.warning(f"⚠️ 롤업 저장 실패: {e}")
+
+                # ✅ 누적 롤업 조회 (이번 분석 이전 이력 포함, 요청한 해상도 파일만 읽음)
+                with st.expander("🕒 시간 버킷 롤업 (누적)"):
+                    try:
+                        for tab, res in zip(st.tabs(["일", "시간", "주"]), ["day", "hour", "week"]):
+                            with tab:
+                                rollup = load_rollup(address, res)
+                                if rollup.empty:
+                                    st.info("📭 집계된 롤업이 없습니다.")
+                                else:
+                                    st.bar_chart(rollup.set_index('bucket')[['tx_count', 'counterparty_n']])
+                    except Exception as e:
+                        st.warning(f"⚠️ 롤업 조회 실패: {e}")
+
+                # ✅ 참조 분포에 이번 주소 반영 (이미 반영된 주소는 건너뜀)
+                try:
+                    if update_reference(reference, address, df):
+                        save_reference(reference)
+                except Exception as e:
+                    st.warning(f"⚠️ 참조 분포 저장 실패: {e}")
+
+                # ✅ 행 단위 플래그 + 점수를 결과 저장소에 기록 (같은 데이터 버전은 한 번만)
+                try:
+                    get_result_store().append(address, df, {
+                        'freq_score': freq_score, 'amount_score': amount_score, 'tumbler_score': tumbler_score,
+                        'extortion_score': extortion_score, 'total_score': total_score,
+                    }, make_run_id(address, analysis_key[2]))
+                except Exception as e:
+                    st.warning(f"⚠️ 결과 저장 실패: {e}")
+
+                # ✅ 제재 목록 재검사용 역색인에 이번 분석 기록 (상대 주소 → case)
+                try:
+                    record_case(address, tx_json, total_score)
+                except Exception as e:
+                    st.warning(f"⚠️ case 기록 실패: {e}")
+
+                # ✅ 그래프 저장소에 트랜잭션 추가 (이미 저장된 tx는 건너뜀)
+                try:
+                    graph_store = get_graph_store()
+                    graph_store.add_transactions(tx_json["txs"])
+                    graph_store.maybe_compact()  # 백그라운드에서 정리, 바로 반환
+                    if graph_store.last_compact_error is not None:
+                        st.warning(f"⚠️ 그래프 저장소 정리 실패 (다음 분석 때 다시 시도): {graph_store.last_compact_error}")
+                except Exception as e:
+                    graph_store = None
+                    st.warning(f"⚠️ 그래프 저장소 갱신 실패: {e}")
 
 
 
@@ -232,6 +335,39 @@ if st.button("🔍 거래 흐름 분석 시작"):
             st.subheader("📋 전처리된 트랜잭션 데이터")
             st.dataframe(df)
 
+            # ✅ rules.json 사용자 정의 규칙 (종합 점수에는 포함하지 않음)
+            try:
+                _, rule_scores = evaluate_rules(df, load_rules())
+                with st.expander("📐 사용자 정의 규칙 점수 (rules.json)"):
+                    st.plotly_chart(plot_score_bars(rule_scores), use_container_width=True)
+            except Exception as e:
+                st.warning(f"⚠️ 규칙 평가 실패: {e}")
+
+            with st.expander("⚙️ 요청 병합 통계 (전체 세션)"):
+                st.json({'fetch': fetch_flight.metrics(), 'analysis': analysis_flight.metrics()})
+
+            # ✅ 이 주소의 과거 분석 점수 (Parquet 저장소에서 점수 컬럼만 조회, 기록 대기 중인 결과는 제외)
+            with st.expander("🗂 과거 분석 점수 이력"):
+                try:
+                    history = score_history(addresses=[address]).to_pandas()
+                    if history.empty:
+                        st.info("📭 저장된 분석 이력이 없습니다.")
+                    else:
+                        st.dataframe(history)
+                    st.caption(f"기록 대기 중인 행: {get_result_store().pending_rows()}")
+                except Exception as e:
+                    st.warning(f"⚠️ 이력 조회 실패: {e}")
+
+            # ✅ spent_by 기반 peel chain 추적 (요청 예산 내에서만)
+            if trace_chains and not df.empty:
+                st.subheader("🔗 Peel chain 추적")
+                chains, trace_stats = trace_spend_chains(df, address=address)
+                st.caption(f"API 요청 {trace_stats['requests']}건 · 조회 성공 {trace_stats['fetched']}건 · 추적 단계 {trace_stats['hops']}")
+                if chains.empty:
+                    st.info("📭 추적 가능한 spent_by 링크가 없습니다.")
+                else:
+                    st.dataframe(chains)
+
             # ✅ 네트워크 그래프 (전체)
             if not df.empty:
                 st.subheader("🌐 전체 네트워크 그래프")
@@ -246,7 +382,9 @@ if st.button("🔍 거래 흐름 분석 시작"):
             if not df.empty:
                 st.subheader("💎 Top 10 요약형 네트워크")
                 try:
-                    mini_fig = plot_mini_transaction_network(tx_json["txs"])
+                    # 저장소가 있으면 지금까지 누적된 거래 이력 기준 상위 간선 사용
+                    store_edges = graph_store.address_edges(address) if graph_store else None
+                    mini_fig = plot_mini_transaction_network(tx_json["txs"], edges=store_edges or None)
                     if mini_fig:
                         st.plotly_chart(mini_fig, use_container_width=True)
                 except:
@@ -1,60 +1,99 @@
+import numpy as np
 import pandas as pd
+from burst_detector import (
+    DEFAULT_WINDOWS, to_epoch_seconds, rolling_window_counts, tx_events,
+    detect_multiscale_bursts, burst_silence_episodes, flag_rows_in_episodes, flag_times_in_episodes
+)
+from reference_stats import global_percentile
 
-def identify_ransomware_pattern(df, value_z=2.5, time_gap_min=10):
+def identify_ransomware_pattern(df, value_z=2.5, time_gap_min=10, reference=None, value_pct=0.99):
     """
     랜섬웨어 패턴 탐지:
-    - 고액 전송 (z-score > 2.5)
+    - 고액 전송 (z-score > 2.5, reference가 충분하면 전체 분포 기준 상위 1%)
     - 짧은 시간 간격 (10분 이내)
     """
     if df.empty or 'btc_value' not in df.columns or 'confirmed' not in df.columns:
         return pd.DataFrame()
 
-    df = df.copy()
-    df = df.sort_values('confirmed')
+    df = df.sort_values('confirmed')  # sort_values가 새 DataFrame을 반환하므로 별도 copy 불필요
     df['time_diff_min'] = df['confirmed'].diff().dt.total_seconds() / 60.0
 
     mean_val = df['btc_value'].mean()
     std_val = df['btc_value'].std()
     df['z_score'] = (df['btc_value'] - mean_val) / std_val
 
-    df['ransomware_flag'] = (df['z_score'] > value_z) & (df['time_diff_min'] < time_gap_min)
+    pct = global_percentile(reference, 'amount', df['btc_value'].to_numpy(dtype=float))
+    high_value = (pct >= value_pct) if pct is not None else (df['z_score'] > value_z)
+    df['ransomware_flag'] = high_value & (df['time_diff_min'] < time_gap_min)
 
     return df[['tx_hash', 'confirmed', 'btc_value', 'time_diff_min', 'z_score', 'ransomware_flag']]
 
 
-def identify_sextortion_pattern(df, avg_gap_min=60, burst_threshold=5):
+def multiscale_burst_rows(df, windows=DEFAULT_WINDOWS, min_count=3, rate_factor=3.0):
+    """
+    다중 스케일 burst 에피소드에 속한 행 표시
+    - 트랜잭션 단위 이벤트로 스케일별 burst 에피소드 탐지 (detect_multiscale_bursts)
+    - 평균 간격으로 본 기대 건수의 rate_factor배 이상이 min_count가 되는 스케일만 사용
+      (평소에도 min_count건이 차는 긴 창은 burst로 보지 않음)
+    - 반환: (행별 burst 여부, 행별로 해당하는 가장 작은 스케일(초, 없으면 NaN))
+    """
+    flags = np.zeros(len(df), dtype=bool)
+    scale = np.full(len(df), np.nan)
+    ts, values = tx_events(df)
+    if len(ts) < min_count:
+        return flags, scale
+
+    mean_gap = (ts[-1] - ts[0]) / (len(ts) - 1)
+    usable = [w for w in windows if mean_gap <= 0 or min_count >= rate_factor * w / mean_gap]
+    episodes = detect_multiscale_bursts(ts, values, windows=usable, min_count=min_count)
+    if episodes.empty:
+        return flags, scale
+
+    confirmed = pd.to_datetime(df['confirmed'], errors='coerce', utc=True)
+    valid = confirmed.notna().to_numpy()
+    row_ts = to_epoch_seconds(confirmed[valid])
+    for window in sorted(usable, reverse=True):
+        hit = np.zeros(len(df), dtype=bool)
+        hit[valid] = flag_times_in_episodes(row_ts, episodes[episodes['scale'] == window])
+        scale[hit] = window
+        flags |= hit
+    return flags, scale
+
+
+def identify_sextortion_pattern(df, avg_gap_min=60, burst_threshold=5, windows=DEFAULT_WINDOWS):
     """
     섹스토션 패턴 탐지:
     - 전반적으로 거래 간격이 김 (평균 간격 ≥ avg_gap_min)
-    - 특정 시점에 burst 발생 (1분 내 burst_threshold건 이상)
+    - 특정 시점에 burst 발생 (windows 스케일 중 하나에서 burst_threshold건 이상 몰린 에피소드)
     """
     if df.empty or 'confirmed' not in df.columns:
         return pd.DataFrame()
 
-    df = df.sort_values('confirmed').copy()
+    df = df.sort_values('confirmed')
 
     df['time_diff'] = df['confirmed'].diff().dt.total_seconds() / 60.0
     avg_gap = df['time_diff'].mean()
 
-    df = df.set_index('confirmed')
-    df['rolling_count'] = df['tx_hash'].rolling('1min').count()
-    df = df.reset_index()
+    df['rolling_count'] = rolling_window_counts(to_epoch_seconds(df['confirmed']), 60)
+    burst, df['burst_scale'] = multiscale_burst_rows(df, windows=windows, min_count=burst_threshold)
 
-    df['sextortion_flag'] = (avg_gap >= avg_gap_min) & (df['rolling_count'] >= burst_threshold)
+    df['sextortion_flag'] = (avg_gap >= avg_gap_min) & burst
 
-    return df[['tx_hash', 'confirmed', 'btc_value', 'time_diff', 'rolling_count', 'sextortion_flag']]
+    return df[['tx_hash', 'confirmed', 'btc_value', 'time_diff', 'rolling_count', 'burst_scale', 'sextortion_flag']]
 
 
-def identify_tumbler_pattern(df, std_threshold_val=0.0002, std_threshold_time=5.0, burst_z=2.5, burst_count=4):
+def identify_tumbler_pattern(df, std_threshold_val=0.0002, std_threshold_time=5.0, burst_z=2.5, burst_count=4,
+                             windows=DEFAULT_WINDOWS):
     """
     텀블러 패턴 탐지:
     - 거래 금액과 간격이 일정 (표준편차 매우 작음)
-    - 특정 시점에서 급등 거래 또는 burst 발생
+    - 특정 시점에서 급등 거래 또는 burst 발생 (windows 스케일 중 하나에서 burst_count건 이상)
+    - CoinJoin(coinjoin_flag)은 별도 규칙(rules.json의 coinjoin)으로만 점수화, 여기서는 컬럼만 함께 반환
     """
     if df.empty or 'btc_value' not in df.columns or 'confirmed' not in df.columns:
         return pd.DataFrame()
 
-    df = df.sort_values('confirmed').copy()
+    df = df.sort_values('confirmed')
 
     df['time_diff'] = df['confirmed'].diff().dt.total_seconds() / 60.0
 
@@ -63,42 +102,51 @@ def identify_tumbler_pattern(df, std_threshold_val=0.0002, std_threshold_time=5.
     mean_val = df['btc_value'].mean()
     df['z_score'] = (df['btc_value'] - mean_val) / std_val if std_val > 0 else 0
 
-    df = df.set_index('confirmed')
-    df['rolling_count'] = df['tx_hash'].rolling('1min').count()
-    df = df.reset_index()
+    df['rolling_count'] = rolling_window_counts(to_epoch_seconds(df['confirmed']), 60)
+    burst, df['burst_scale'] = multiscale_burst_rows(df, windows=windows, min_count=burst_count)
 
     df['tumbler_flag'] = (
         (std_val < std_threshold_val) &
         (std_time < std_threshold_time) &
-        ((df['z_score'].abs() > burst_z) | (df['rolling_count'] >= burst_count))
+        ((df['z_score'].abs() > burst_z) | burst)
     )
 
-    return df[['tx_hash', 'confirmed', 'btc_value', 'time_diff', 'z_score', 'rolling_count', 'tumbler_flag']]
+    columns = ['tx_hash', 'confirmed', 'btc_value', 'time_diff', 'z_score', 'rolling_count', 'burst_scale',
+               'tumbler_flag']
+    return df[columns + [c for c in ('coinjoin_flag', 'equal_output_n') if c in df.columns]]
 
 
 def identify_extortion_pattern(df, burst_threshold=3, gap_threshold=100, std_threshold=20):
     """
     협박 사기 패턴 탐지:
     - 시간 간격 분산이 큼
-    - 특정 시점에 burst 발생
-    - 이후 긴 공백 존재
+    - 특정 시점에 burst 발생 (Kleinberg burst 구간, burst_threshold건 이상)
+    - 이후 긴 공백 존재 (burst 종료 후 gap_threshold분 이상)
     """
     if df.empty or 'confirmed' not in df.columns:
         return pd.DataFrame()
 
-    df = df.sort_values('confirmed').copy()
+    df = df.sort_values('confirmed')
 
     df['time_diff'] = df['confirmed'].diff().dt.total_seconds() / 60.0
     std_time = df['time_diff'].std()
 
-    df = df.set_index('confirmed')
-    df['rolling_count'] = df['tx_hash'].rolling('1min').count()
-    df = df.reset_index()
+    df['rolling_count'] = rolling_window_counts(to_epoch_seconds(df['confirmed']), 60)
 
-    df['extortion_flag'] = (
-        (std_time >= std_threshold) &
-        (df['rolling_count'] >= burst_threshold) &
-        (df['time_diff'] >= gap_threshold)
-    )
+    episodes = burst_silence_episodes(df, min_count=burst_threshold, min_silence_sec=gap_threshold * 60)
+    df['extortion_flag'] = (std_time >= std_threshold) & flag_rows_in_episodes(df['confirmed'], episodes)
 
     return df[['tx_hash', 'confirmed', 'btc_value', 'time_diff', 'rolling_count', 'extortion_flag']]
+
+
+def identify_burst_episodes(df, windows=DEFAULT_WINDOWS, min_count=3):
+    """
+    다중 스케일 burst 에피소드 요약:
+    - 트랜잭션 단위로 압축한 뒤 스케일(초)별로 burst 구간 탐지
+    - 행 단위 플래그 대신 scale / start / end / count / volume / silence_after 레코드 반환
+    """
+    if df.empty or 'confirmed' not in df.columns:
+        return pd.DataFrame()
+
+    ts, values = tx_events(df)
+    return detect_multiscale_bursts(ts, values, windows=windows, min_count=min_count)
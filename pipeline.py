@@ -0,0 +1,28 @@
+# 이상 패턴 탐지 + 점수 계산 파이프라인 (Streamlit UI와 분리)
+
+from detect_patterns import detect_high_frequency, detect_high_amount, detect_tumbler_pattern, detect_extortion_pattern
+from calculate_score import (
+    score_high_frequency, score_high_amount,
+    score_tumbler, score_extortion,
+    calculate_total_score
+)
+
+
+def run_analysis(df, reference=None):
+    """
+    전처리된 거래 DataFrame에 4가지 탐지를 적용하고 점수 계산
+    - reference: 전체 분석 주소 기준 참조 분포 (reference_stats), 없으면 주소 내 기준 사용
+    - 반환: (df, freq_score, amount_score, tumbler_score, extortion_score, total_score)
+    """
+    df = detect_high_frequency(df)
+    df = detect_high_amount(df, reference=reference)
+    df = detect_tumbler_pattern(df)
+    df = detect_extortion_pattern(df)
+
+    freq_score = score_high_frequency(df)
+    amount_score = score_high_amount(df)
+    tumbler_score = score_tumbler(df)
+    extortion_score = score_extortion(df)
+
+    total_score = calculate_total_score(freq_score, amount_score, tumbler_score, extortion_score)
+    return df, freq_score, amount_score, tumbler_score, extortion_score, total_score
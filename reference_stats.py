@@ -0,0 +1,255 @@
+# 전체 분석 주소 기준 참조 분포 (병합 가능한 스트리밍 분위수 스케치)
+
+import contextlib
+import os
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+
+from config import REFERENCE_STATS_PATH, REFERENCE_MIN_COUNT
+from burst_detector import tx_events, rolling_window_counts
+
+# 참조 분포 종류
+# - amount: 출력 단위 BTC 금액
+# - gap: 트랜잭션 간 도착 간격 (초)
+# - burst: 트랜잭션 시점 기준 1분 내 거래 수
+METRICS = ('amount', 'gap', 'burst')
+
+# Streamlit 세션 간 공유되는 참조 통계의 갱신/조회 직렬화용
+_lock = threading.RLock()
+
+
+class QuantileSketch:
+    """
+    t-digest 방식의 병합 가능한 분위수 스케치
+    - 중심점(mean, weight) 배열만 유지, 크기는 약 compression/2개로 제한
+    - 양 끝 분위수일수록 작은 중심점을 사용 (arcsin 스케일 함수)
+    - 조회(quantile/percentile)는 누적 가중치 이진 탐색 → O(log k)
+    """
+
+    def __init__(self, compression=400, means=None, weights=None):
+        self.compression = compression
+        self.means = np.asarray(means if means is not None else [], dtype=float)
+        self.weights = np.asarray(weights if weights is not None else [], dtype=float)
+        self._buffer = []
+        self._cum = None
+
+    @property
+    def count(self):
+        self._flush()
+        return float(self.weights.sum())
+
+    def _scale(self, q):
+        return self.compression / (2 * np.pi) * np.arcsin(2 * np.clip(q, 0.0, 1.0) - 1)
+
+    def _compress(self, means, weights):
+        if means.size == 0:
+            return means, weights
+        order = np.argsort(means, kind='mergesort')
+        means, weights = means[order], weights[order]
+
+        # 왼쪽 누적 분위수의 k 값이 같은 정수 구간에 속하는 점들을 하나의 중심점으로 병합
+        total = weights.sum()
+        q_left = (np.cumsum(weights) - weights) / total
+        k = np.floor(self._scale(q_left)).astype(np.int64)
+        heads = np.flatnonzero(np.diff(k, prepend=k[0] - 1))
+        w = np.add.reduceat(weights, heads)
+        m = np.add.reduceat(means * weights, heads) / w
+        return m, w
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        values = np.concatenate(self._buffer)
+        self._buffer = []
+        means = np.concatenate([self.means, values])
+        weights = np.concatenate([self.weights, np.ones(values.size)])
+        self.means, self.weights = self._compress(means, weights)
+        self._cum = None
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        if values.size:
+            self._buffer.append(values)
+            if sum(b.size for b in self._buffer) >= 20 * self.compression:
+                self._flush()
+        return self
+
+    def merge(self, other):
+        """
+        다른 워커의 스케치를 병합 (결과는 두 입력을 합친 스트림의 스케치와 근사적으로 같음)
+        """
+        self._flush()
+        other._flush()
+        means = np.concatenate([self.means, other.means])
+        weights = np.concatenate([self.weights, other.weights])
+        self.means, self.weights = self._compress(means, weights)
+        self._cum = None
+        return self
+
+    def _cumulative(self):
+        self._flush()
+        if self._cum is None:
+            # 각 중심점 가중치의 절반 지점을 해당 mean의 누적 위치로 사용
+            self._cum = np.cumsum(self.weights) - self.weights / 2
+        return self._cum
+
+    def quantile(self, q):
+        """
+        분위수 q (0~1)에 해당하는 값 (스케치가 비어 있으면 NaN)
+        """
+        cum = self._cumulative()
+        if cum.size == 0:
+            return np.nan
+        return np.interp(np.asarray(q, dtype=float) * self.weights.sum(), cum, self.means)
+
+    def percentile(self, x):
+        """
+        값 x의 전체 분포 내 누적 비율 (0~1, 벡터 입력 가능, 스케치가 비어 있으면 NaN)
+        """
+        cum = self._cumulative()
+        if cum.size == 0:
+            return np.full(np.shape(x), np.nan)
+        return np.interp(np.asarray(x, dtype=float), self.means, cum) / self.weights.sum()
+
+
+def empty_reference(compression=400, shard=(0, 1)):
+    """
+    빈 참조 통계
+    - shard=(i, n): 여러 워커가 나눠 쌓을 때 이 참조가 맡는 주소 분할 (주소 해시 % n == i)
+      기본 (0, 1)은 모든 주소를 맡음 (단일 프로세스)
+    """
+    return {
+        'sketches': {metric: QuantileSketch(compression) for metric in METRICS},
+        'addresses': np.empty(0, dtype=np.uint64),
+        'shard': np.asarray(shard, dtype=np.int64),
+    }
+
+
+def _address_key(address):
+    return pd.util.hash_array(np.asarray([str(address)], dtype=object))
+
+
+def owns_address(ref, address):
+    """
+    주소가 이 참조의 shard에 속하는지 여부 (워커 라우팅/중복 방지용)
+    """
+    index, count = (int(v) for v in ref['shard'])
+    return int(_address_key(address)[0] % np.uint64(count)) == index
+
+
+def update_reference(ref, address, df):
+    """
+    분석이 끝난 주소 1건의 금액/간격/burst 분포를 참조 스케치에 반영
+    - 이미 반영된 주소, 이 참조의 shard에 속하지 않는 주소는 건너뜀 (중복 집계 방지)
+    - 반환: 실제로 반영되었는지 여부
+    """
+    if df is None or df.empty or not owns_address(ref, address):
+        return False
+    key = _address_key(address)
+    ts, _ = tx_events(df)
+
+    with _lock:
+        if np.isin(key, ref['addresses']).any():
+            return False
+
+        if 'btc_value' in df.columns:
+            ref['sketches']['amount'].update(df['btc_value'].to_numpy(dtype=float))
+        if ts.size > 1:
+            ref['sketches']['gap'].update(np.diff(ts))
+        if ts.size:
+            ref['sketches']['burst'].update(rolling_window_counts(ts, 60))
+
+        ref['addresses'] = np.union1d(ref['addresses'], key)
+    return True
+
+
+def merge_references(refs):
+    """
+    여러 워커의 참조 통계를 하나로 병합
+    - 스케치는 주소별 기여를 분리할 수 없으므로 입력들의 주소 집합이 서로 겹치면 안 됨
+      (워커마다 empty_reference(shard=(i, n))로 분할을 나누면 겹치지 않음)
+    - 겹치는 주소가 있으면 같은 주소가 두 번 집계되므로 병합하지 않고 ValueError
+    """
+    merged = empty_reference()
+    for ref in refs:
+        overlap = np.intersect1d(merged['addresses'], ref['addresses']).size
+        if overlap:
+            raise ValueError(f"❗ 참조 통계의 주소 {overlap}개가 다른 워커와 겹칩니다. shard를 나눠 쌓아야 합니다.")
+        for metric in METRICS:
+            merged['sketches'][metric].merge(ref['sketches'][metric])
+        merged['addresses'] = np.union1d(merged['addresses'], ref['addresses'])
+    return merged
+
+
+def merge_reference_files(paths, out_path=REFERENCE_STATS_PATH):
+    """
+    워커별로 저장된 참조 통계 파일들을 병합해 out_path에 저장
+    """
+    merged = merge_references(load_reference(path) for path in paths)
+    save_reference(merged, out_path)
+    return merged
+
+
+def save_reference(ref, path=REFERENCE_STATS_PATH):
+    """
+    참조 통계를 압축 npz로 저장 (임시 파일 → rename으로 원자적 교체)
+    - 쓰기와 교체까지 _lock 안에서 수행, 임시 파일은 저장마다 고유 (동시 저장끼리 섞이지 않음)
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    with _lock:
+        arrays = {'addresses': ref['addresses'], 'shard': ref['shard']}
+        for metric, sketch in ref['sketches'].items():
+            sketch._flush()
+            arrays[f"{metric}__means"] = sketch.means
+            arrays[f"{metric}__weights"] = sketch.weights
+            arrays[f"{metric}__compression"] = np.asarray(sketch.compression)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(tmp_path, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+
+
+def load_reference(path=REFERENCE_STATS_PATH):
+    """
+    저장된 참조 통계 불러오기 (없으면 빈 참조 통계)
+    """
+    if not os.path.exists(path):
+        return empty_reference()
+
+    ref = empty_reference()
+    with np.load(path, allow_pickle=False) as data:
+        ref['addresses'] = data['addresses']
+        if 'shard' in data.files:
+            ref['shard'] = data['shard']
+        for metric in METRICS:
+            if f"{metric}__means" in data.files:
+                ref['sketches'][metric] = QuantileSketch(
+                    int(data[f"{metric}__compression"]),
+                    data[f"{metric}__means"],
+                    data[f"{metric}__weights"]
+                )
+    return ref
+
+
+def global_percentile(ref, metric, values, min_count=REFERENCE_MIN_COUNT):
+    """
+    값 배열의 전체 분포 기준 누적 비율 (0~1)
+    - 참조 표본이 min_count 미만이면 None 반환 (호출 측에서 주소 내 기준으로 대체)
+    """
+    if ref is None:
+        return None
+    with _lock:
+        sketch = ref['sketches'][metric]
+        if sketch.count < min_count:
+            return None
+        return sketch.percentile(values)
@@ -0,0 +1,287 @@
+# 분석 결과 저장소: 날짜/주소 파티션 Parquet 데이터셋 + Arrow 기반 조회
+
+import atexit
+import hashlib
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from config import RESULTS_DIR, RESULTS_BATCH_ROWS, RESULTS_FLUSH_SEC, RESULTS_COMPRESSION
+
+# 고정 스키마 (출력 행 1개 = 레코드 1개, 주소 단위 점수는 행마다 반복 → Parquet 사전/RLE 인코딩으로 압축)
+# - 청크 분석처럼 행 단위 결과가 없으면 tx 컬럼이 null인 점수 행 1개만 기록
+# - 탐지기가 만들지 않은 플래그/지표 컬럼은 null
+RESULT_SCHEMA = pa.schema([
+    ('run_id', pa.string()),
+    ('analyzed_at', pa.timestamp('us', tz='UTC')),
+    ('tx_hash', pa.string()),
+    ('confirmed', pa.timestamp('us', tz='UTC')),
+    ('btc_value', pa.float64()),
+    ('counterparty', pa.string()),
+    ('tx_input_n', pa.int32()),
+    ('tx_output_n', pa.int32()),
+    ('z_score', pa.float64()),
+    ('amount_pct', pa.float64()),
+    ('fee_rate', pa.float64()),
+    ('coinjoin_flag', pa.bool_()),
+    ('change_flag', pa.bool_()),
+    ('high_freq_flag', pa.bool_()),
+    ('high_amount_flag', pa.bool_()),
+    ('tumbler_flag', pa.bool_()),
+    ('extortion_flag', pa.bool_()),
+    ('freq_score', pa.int16()),
+    ('amount_score', pa.int16()),
+    ('tumbler_score', pa.int16()),
+    ('extortion_score', pa.int16()),
+    ('total_score', pa.int16()),
+])
+PARTITION_SCHEMA = pa.schema([('date', pa.string()), ('address', pa.string())])
+DATASET_SCHEMA = pa.schema(list(RESULT_SCHEMA) + list(PARTITION_SCHEMA))
+SCORE_COLUMNS = ('freq_score', 'amount_score', 'tumbler_score', 'extortion_score', 'total_score')
+
+
+def make_run_id(address, version):
+    """
+    분석 1회 식별자 (주소 + 데이터 버전 해시) → 같은 데이터를 다시 분석해도 같은 run_id
+    """
+    return hashlib.sha1(f"{address}:{version}".encode()).hexdigest()[:16]
+
+
+def _column(df, name, arrow_type):
+    if name not in df.columns:
+        return pa.nulls(len(df), type=arrow_type)
+    values = df[name]
+    if pa.types.is_timestamp(arrow_type):
+        values = pd.to_datetime(values, errors='coerce', utc=True)
+    elif pa.types.is_boolean(arrow_type):
+        values = values.astype('boolean')
+    elif pa.types.is_integer(arrow_type):
+        values = pd.to_numeric(values, errors='coerce').astype('Int64')
+    elif pa.types.is_floating(arrow_type):
+        values = pd.to_numeric(values, errors='coerce')
+    return pa.array(values, type=arrow_type, from_pandas=True)
+
+
+def results_to_table(address, df, scores, run_id, analyzed_at=None):
+    """
+    run_analysis 결과 → RESULT_SCHEMA 형식 Arrow 테이블 (+ date/address 파티션 컬럼)
+    - df: 탐지 플래그가 붙은 DataFrame (없으면 점수 행 1개)
+    - scores: SCORE_COLUMNS 이름 → 점수 dict
+    """
+    analyzed_at = pd.Timestamp(analyzed_at if analyzed_at is not None else time.time(), unit='s', tz='UTC')
+    if df is not None and df.empty:
+        df = None
+    n = 1 if df is None else len(df)
+
+    arrays = {}
+    for field in RESULT_SCHEMA:
+        if field.name == 'run_id':
+            arrays[field.name] = pa.array([run_id] * n, type=field.type)
+        elif field.name == 'analyzed_at':
+            arrays[field.name] = pa.array([analyzed_at] * n, type=field.type)
+        elif field.name in SCORE_COLUMNS:
+            arrays[field.name] = pa.array(np.full(n, int(scores.get(field.name, 0)), dtype=np.int16))
+        elif df is None:
+            arrays[field.name] = pa.nulls(n, field.type)
+        elif field.name == 'counterparty':
+            arrays[field.name] = _column(df, 'address', field.type)
+        else:
+            arrays[field.name] = _column(df, field.name, field.type)
+    arrays['date'] = pa.array([analyzed_at.strftime('%Y-%m-%d')] * n, type=pa.string())
+    arrays['address'] = pa.array([address] * n, type=pa.string())
+    return pa.Table.from_pydict(arrays, schema=DATASET_SCHEMA)
+
+
+class ResultStore:
+    """
+    분석 결과를 모아 두었다가 일정 행 수/시간마다 Parquet 파티션으로 기록
+    - 경로: root/date=YYYY-MM-DD/address=<주소>/part-*.parquet (hive 파티션)
+    - 기록 단위마다 새 파일을 추가하므로 기존 파일은 수정하지 않음
+    - 같은 run_id는 프로세스 안에서 한 번만 기록 (세션 간 공유 분석 결과의 중복 방지)
+    - 백그라운드 스레드가 요청이 없어도 flush_sec 안에 버퍼를 기록
+    - 기록에 실패하면 버퍼를 그대로 두고 다음 flush에서 다시 시도
+    """
+
+    def __init__(self, root=RESULTS_DIR, batch_rows=RESULTS_BATCH_ROWS, flush_sec=RESULTS_FLUSH_SEC,
+                 compression=RESULTS_COMPRESSION):
+        self.root = root
+        self.batch_rows = batch_rows
+        self.flush_sec = flush_sec
+        self.compression = compression
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._pending = []          # (run_id, table)
+        self._pending_runs = set()  # 버퍼에 있거나 변환 중인 run_id
+        self._pending_rows = 0
+        self._oldest = None
+        self._written_runs = set()  # 실제로 파일에 기록된 run_id
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="result-store-flush", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def append(self, address, df, scores, run_id, analyzed_at=None):
+        """
+        분석 1회 결과를 버퍼에 추가, 배치 크기/시간을 넘으면 바로 기록
+        - 반환: 버퍼에 추가한 행 수 (이미 기록했거나 버퍼에 있는 run_id면 0)
+        """
+        with self._lock:
+            if run_id in self._written_runs or run_id in self._pending_runs:
+                return 0
+            self._pending_runs.add(run_id)
+        try:
+            table = results_to_table(address, df, scores, run_id, analyzed_at)
+        except BaseException:
+            with self._lock:
+                self._pending_runs.discard(run_id)
+            raise
+        with self._lock:
+            self._pending.append((run_id, table))
+            self._pending_rows += table.num_rows
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+        self.maybe_flush()
+        return table.num_rows
+
+    def _due_in(self):
+        # 다음 시간 기준 flush까지 남은 초 (버퍼가 비었으면 None)
+        if self._oldest is None:
+            return None
+        return self._oldest + self.flush_sec - time.monotonic()
+
+    def maybe_flush(self):
+        with self._lock:
+            due_in = self._due_in()
+            due = self._pending_rows >= self.batch_rows or (due_in is not None and due_in <= 0)
+        if due:
+            self.flush()
+
+    def _run(self):
+        # 조용한 서버에서도 RESULTS_FLUSH_SEC를 지키기 위한 주기 flush
+        while True:
+            with self._lock:
+                due_in = self._due_in()
+            timeout = self.flush_sec if due_in is None else max(due_in, 0)
+            if self._stop.wait(timeout):
+                return
+            try:
+                self.maybe_flush()
+            except Exception as e:
+                # 버퍼는 유지되므로 다음 주기에 다시 시도
+                self.last_error = e
+                self._stop.wait(self.flush_sec)
+
+    def flush(self):
+        """
+        버퍼의 결과를 한 번에 기록 (파티션별 파일 1개씩), 반환: 기록한 행 수
+        - 기록이 끝난 뒤에만 버퍼를 비우고 run_id를 기록 완료로 표시 (실패 시 예외, 버퍼 유지)
+        """
+        with self._lock:
+            if not self._pending:
+                return 0
+            table = pa.concat_tables([t for _, t in self._pending])
+            ds.write_dataset(
+                table, self.root, format='parquet',
+                partitioning=ds.partitioning(PARTITION_SCHEMA, flavor='hive'),
+                basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+                existing_data_behavior='overwrite_or_ignore',
+                file_options=ds.ParquetFileFormat().make_write_options(compression=self.compression),
+            )
+            runs = {run_id for run_id, _ in self._pending}
+            self._written_runs |= runs
+            self._pending_runs -= runs
+            self._pending, self._pending_rows, self._oldest = [], 0, None
+            self.last_error = None
+        return table.num_rows
+
+    def close(self):
+        """
+        백그라운드 flush 스레드를 멈추고 남은 버퍼 기록
+        """
+        self._stop.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join()
+        return self.flush()
+
+    def pending_rows(self):
+        with self._lock:
+            return self._pending_rows
+
+
+def open_results(root=RESULTS_DIR):
+    """
+    저장된 결과 전체를 Arrow Dataset으로 열기 (파일은 조회 시점에 필요한 만큼만 읽음)
+    """
+    if not os.path.isdir(root):
+        return None
+    return ds.dataset(root, format='parquet', schema=DATASET_SCHEMA,
+                      partitioning=ds.partitioning(PARTITION_SCHEMA, flavor='hive'))
+
+
+def results_filter(addresses=None, start=None, end=None, min_total_score=None):
+    """
+    조회 조건 → Arrow 필터 식
+    - addresses/start/end(YYYY-MM-DD, 포함)는 파티션 컬럼 조건 → 해당 디렉터리만 읽음
+    - min_total_score는 Parquet row group 통계로 건너뛸 수 있는 행 조건
+    """
+    expr = None
+    conditions = []
+    if addresses is not None:
+        conditions.append(ds.field('address').isin(list(addresses)))
+    if start is not None:
+        conditions.append(ds.field('date') >= str(start))
+    if end is not None:
+        conditions.append(ds.field('date') <= str(end))
+    if min_total_score is not None:
+        conditions.append(ds.field('total_score') >= min_total_score)
+    for cond in conditions:
+        expr = cond if expr is None else expr & cond
+    return expr
+
+
+def scan_results(columns=None, addresses=None, start=None, end=None, min_total_score=None,
+                 root=RESULTS_DIR):
+    """
+    과거 결과 조회 → Arrow Table (필요한 컬럼/파티션만 읽음, pandas 변환은 호출 측에서 선택)
+    """
+    dataset = open_results(root)
+    if dataset is None:
+        empty = DATASET_SCHEMA.empty_table()
+        return empty.select(columns) if columns else empty
+    return dataset.to_table(columns=columns,
+                            filter=results_filter(addresses, start, end, min_total_score))
+
+
+def iter_results(columns=None, addresses=None, start=None, end=None, min_total_score=None,
+                 batch_size=131072, root=RESULTS_DIR):
+    """
+    scan_results의 스트리밍 버전: RecordBatch 단위로 순회 (전체를 메모리에 올리지 않음)
+    """
+    dataset = open_results(root)
+    if dataset is None:
+        return
+    yield from dataset.to_batches(columns=columns, batch_size=batch_size,
+                                  filter=results_filter(addresses, start, end, min_total_score))
+
+
+def score_history(addresses=None, start=None, end=None, root=RESULTS_DIR):
+    """
+    분석 1회당 1행의 점수 이력 (run_id 기준 중복 제거, 점수 컬럼만 읽음)
+    """
+    columns = ['date', 'address', 'run_id', 'analyzed_at'] + list(SCORE_COLUMNS)
+    table = scan_results(columns=columns, addresses=addresses, start=start, end=end, root=root)
+    if table.num_rows == 0:
+        return table
+    grouped = table.group_by(['date', 'address', 'run_id']).aggregate(
+        [('analyzed_at', 'max')] + [(name, 'max') for name in SCORE_COLUMNS]
+    )
+    grouped = grouped.rename_columns([
+        name[:-4] if name.endswith('_max') else name for name in grouped.column_names
+    ])
+    return grouped.sort_by([('analyzed_at', 'ascending')]).select(columns)
@@ -0,0 +1,347 @@
+# 주소별 다중 해상도 시간 버킷 집계 (분/시간/일/주)
+
+import contextlib
+import os
+import shutil
+import threading
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 내 잠금만 사용
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+from config import ROLLUP_DIR, ROLLUP_RESOLUTIONS, ROLLUP_DISTINCT_K, ROLLUP_SEGMENT_BUCKETS
+
+# 주 단위 버킷을 월요일 00:00(UTC)에 맞추기 위한 오프셋 (1970-01-01은 목요일)
+WEEK_OFFSET = 3 * 86400
+
+# 주소별 쓰기 잠금 (같은 주소를 여러 세션이 동시에 갱신해도 load → merge → save가 겹치지 않도록)
+_locks_guard = threading.Lock()
+_address_locks = {}
+
+
+def _to_epoch_seconds(series):
+    """
+    confirmed 컬럼 → (epoch 초 int64 배열, 유효 여부 마스크)
+    """
+    ts = pd.to_datetime(series, errors='coerce', utc=True)
+    valid = ts.notna().to_numpy()
+    seconds = np.zeros(len(ts), dtype=np.int64)
+    seconds[valid] = ts[valid].to_numpy(dtype='datetime64[s]').astype(np.int64)
+    return seconds, valid
+
+
+def _bucketize(seconds, width):
+    """
+    epoch 초 배열을 해상도(width초) 단위 버킷 시작 시각으로 내림
+    """
+    offset = WEEK_OFFSET if width == ROLLUP_RESOLUTIONS.get('week') else 0
+    return (seconds + offset) // width * width - offset
+
+
+def _hash_values(values):
+    return pd.util.hash_array(np.asarray(values, dtype=object).astype(str))
+
+
+def _empty_sketch():
+    return pd.DataFrame({'bucket': np.empty(0, dtype=np.int64), 'cp': np.empty(0, dtype=np.uint32)})
+
+
+def _sketch_hash(values):
+    # KMV용 32비트 해시 (상위 32비트, 버킷당 distinct 수가 2^32보다 훨씬 작으므로 충분)
+    return (_hash_values(values) >> np.uint64(32)).astype(np.uint32)
+
+
+def _kmv_merge(sketch, k=ROLLUP_DISTINCT_K):
+    """
+    버킷별 KMV(k개 최소 해시값) distinct 스케치 병합
+    - (bucket, 해시) 쌍을 합친 뒤 버킷마다 가장 작은 해시 k개만 유지 → 버킷당 저장량 상한 k
+    """
+    sketch = sketch.drop_duplicates().sort_values(['bucket', 'cp'], kind='mergesort')
+    return sketch.groupby('bucket', sort=False).head(k).reset_index(drop=True)
+
+
+def _kmv_estimate(sketch, k=ROLLUP_DISTINCT_K):
+    """
+    버킷별 distinct 추정치 (k개 미만이면 정확한 개수, 아니면 (k-1) / k번째 최소 해시의 정규화 값)
+    """
+    grouped = sketch.groupby('bucket')['cp']
+    size = grouped.size()
+    kth = (grouped.max().astype(float) + 1) / 2.0 ** 32
+    estimate = np.where(size < k, size, np.round((k - 1) / kth))
+    return pd.Series(estimate.astype(np.int64), index=size.index)
+
+
+def _empty_state():
+    return {
+        'seen': np.empty(0, dtype=np.uint64),
+        'tables': {},
+        'sketches': {},
+    }
+
+
+def _address_dir(address, root):
+    return os.path.join(root, address)
+
+
+@contextlib.contextmanager
+def _address_lock(address, root):
+    """
+    주소 단위 배타 잠금: 프로세스 내 threading.Lock + (가능하면) 프로세스 간 flock
+    """
+    address_dir = _address_dir(address, root)
+    with _locks_guard:
+        lock = _address_locks.setdefault(os.path.abspath(address_dir), threading.Lock())
+    with lock:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(address_dir, exist_ok=True)
+        with open(os.path.join(address_dir, "LOCK"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _current_generation(address, root):
+    # CURRENT 파일이 가리키는 세대 디렉터리 (원자적 교체 기준)
+    try:
+        with open(os.path.join(_address_dir(address, root), "CURRENT")) as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    return os.path.join(_address_dir(address, root), name) if name else None
+
+
+def _segment_span(width):
+    # 세그먼트 1개가 덮는 시간 폭 (초)
+    return width * ROLLUP_SEGMENT_BUCKETS
+
+
+def _segment_path(gen_dir, res, seg):
+    return os.path.join(gen_dir, f"{res}.{seg}.npz")
+
+
+def _list_segments(gen_dir, res):
+    if gen_dir is None:
+        return []
+    segments = []
+    for name in os.listdir(gen_dir):
+        prefix, _, rest = name.partition('.')
+        if prefix == res and rest.endswith('.npz'):
+            segments.append(int(rest[:-len('.npz')]))
+    return sorted(segments)
+
+
+def _load_segment(gen_dir, res, seg):
+    path = None if gen_dir is None else _segment_path(gen_dir, res, seg)
+    if path is None or not os.path.exists(path):
+        return None, _empty_sketch()
+    with np.load(path, allow_pickle=False) as data:
+        table = pd.DataFrame({k: data[k] for k in data.files if not k.startswith('kmv__')})
+        sketch = pd.DataFrame({'bucket': data['kmv__bucket'], 'cp': data['kmv__cp']})
+    return table, sketch
+
+
+def _write_segment(gen_dir, res, seg, table, sketch):
+    arrays = {col: table[col].to_numpy() for col in table.columns}
+    arrays['kmv__bucket'] = sketch['bucket'].to_numpy(dtype=np.int64)
+    arrays['kmv__cp'] = sketch['cp'].to_numpy(dtype=np.uint32)
+    np.savez_compressed(_segment_path(gen_dir, res, seg), **arrays)
+
+
+def _load_seen(gen_dir):
+    if gen_dir is None:
+        return np.empty(0, dtype=np.uint64)
+    with np.load(os.path.join(gen_dir, "seen.npz"), allow_pickle=False) as data:
+        return data['seen']
+
+
+def _read_generation(gen_dir, resolutions):
+    state = _empty_state()
+    if resolutions is None:
+        state['seen'] = _load_seen(gen_dir)
+    for res in resolutions or ROLLUP_RESOLUTIONS:
+        parts = [_load_segment(gen_dir, res, seg) for seg in _list_segments(gen_dir, res)]
+        if parts:
+            state['tables'][res] = pd.concat([t for t, _ in parts], ignore_index=True)
+            state['sketches'][res] = pd.concat([k for _, k in parts], ignore_index=True)
+    return state
+
+
+def load_rollup_state(address, root=ROLLUP_DIR, resolutions=None):
+    """
+    저장된 롤업 상태를 불러옴 (없으면 빈 상태)
+    - seen: 이미 집계된 tx_hash 해시값 (중복 집계 방지용, 해상도 테이블과 별도 파일)
+    - tables: 해상도별 집계 DataFrame (세그먼트 파일을 이어 붙임)
+    - sketches: 해상도별 버킷 distinct counterparty KMV 스케치
+    - resolutions가 주어지면 해당 해상도 파일만 읽고 seen은 읽지 않음 (조회용)
+    - 잠금 없이 읽으므로 읽는 도중 세대가 교체되면 새 세대로 다시 읽음
+    """
+    for attempt in range(3):
+        gen_dir = _current_generation(address, root)
+        if gen_dir is None:
+            return _empty_state()
+        try:
+            return _read_generation(gen_dir, resolutions)
+        except FileNotFoundError:
+            if attempt == 2:
+                raise
+
+
+def _switch_generation(address_dir, name):
+    """
+    CURRENT를 새 세대로 원자적으로 교체하고 나머지 세대 디렉터리 정리 (주소 잠금 안에서 호출)
+    - 임시 파일 이름은 쓰기마다 고유
+    - 이전 실패로 남은 세대 디렉터리도 함께 삭제
+    """
+    tmp_path = os.path.join(address_dir, f"CURRENT.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "w") as f:
+        f.write(name)
+    os.replace(tmp_path, os.path.join(address_dir, "CURRENT"))
+    for entry in os.listdir(address_dir):
+        if entry.startswith("gen-") and entry != name:
+            shutil.rmtree(os.path.join(address_dir, entry), ignore_errors=True)
+
+
+def _carry_segment(old_gen, new_gen, res, seg):
+    # 바뀌지 않은 세그먼트는 다시 쓰지 않고 새 세대로 하드 링크 (지원하지 않는 파일시스템이면 복사)
+    src, dst = _segment_path(old_gen, res, seg), _segment_path(new_gen, res, seg)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _aggregate(rows, seconds, width, flag_cols, counterparty_col):
+    bucket = _bucketize(seconds, width)
+    frame = pd.DataFrame({
+        'bucket': bucket,
+        'tx_hash': rows['tx_hash'].to_numpy(),
+        'btc_value': rows['btc_value'].astype(float).to_numpy(),
+    })
+    for col in flag_cols:
+        frame[col] = rows[col].fillna(0).astype(int).to_numpy()
+
+    agg = {
+        'tx_count': ('tx_hash', 'nunique'),
+        'output_count': ('tx_hash', 'size'),
+        'btc_sum': ('btc_value', 'sum'),
+        'btc_max': ('btc_value', 'max'),
+    }
+    for col in flag_cols:
+        agg[col] = (col, 'sum')
+    table = frame.groupby('bucket', sort=True).agg(**agg).reset_index()
+
+    if counterparty_col in rows.columns:
+        cp = rows[counterparty_col]
+        valid = cp.notna().to_numpy()
+        sketch = pd.DataFrame({
+            'bucket': bucket[valid],
+            'cp': _sketch_hash(cp[valid].to_numpy()),
+        })
+    else:
+        sketch = _empty_sketch()
+    return table, sketch
+
+
+def _merge_tables(old, new):
+    if old is None or old.empty:
+        return new
+    merged = pd.concat([old.drop(columns=['counterparty_n'], errors='ignore'), new], ignore_index=True, sort=False)
+    flag_cols = [c for c in merged.columns if c.endswith('_flag')]
+    merged[flag_cols] = merged[flag_cols].fillna(0).astype(int)
+
+    agg = {
+        'tx_count': 'sum',
+        'output_count': 'sum',
+        'btc_sum': 'sum',
+        'btc_max': 'max',
+    }
+    agg.update({col: 'sum' for col in flag_cols})
+    return merged.groupby('bucket', sort=True).agg(agg).reset_index()
+
+
+def update_rollup(address, df, root=ROLLUP_DIR, counterparty_col='address'):
+    """
+    새로 수집된 거래 행을 주소의 롤업에 증분 반영
+    - 이미 집계된 tx_hash는 건너뜀 (같은 응답을 다시 넣어도 중복 집계 없음)
+    - 해상도별 count / sum / max BTC, *_flag 합계 갱신
+    - counterparty_n: 버킷별 distinct counterparty 수 (ROLLUP_DISTINCT_K개 미만은 정확, 이상은 KMV 추정)
+    - 주소 단위 잠금 안에서 load → merge → save (동시 갱신도 누락 없이 합산)
+    - 새 거래가 닿은 세그먼트(ROLLUP_SEGMENT_BUCKETS 버킷)만 다시 쓰고 나머지는 새 세대로 링크
+      (seen.npz는 매번 다시 씀, tx당 8바이트)
+    - 반환: 새로 집계한 트랜잭션 수
+    """
+    if df is None or df.empty or 'confirmed' not in df.columns or 'tx_hash' not in df.columns:
+        return 0
+
+    with _address_lock(address, root):
+        old_gen = _current_generation(address, root)
+        seen = _load_seen(old_gen)
+
+        rows = df[df['tx_hash'].notna()]
+        tx_keys = _hash_values(rows['tx_hash'].to_numpy())
+        fresh = ~np.isin(tx_keys, seen)
+        rows = rows[fresh]
+        seconds, valid = _to_epoch_seconds(rows['confirmed'])
+        rows = rows[valid]
+        seconds = seconds[valid]
+        if rows.empty:
+            return 0
+
+        address_dir = _address_dir(address, root)
+        name = f"gen-{uuid.uuid4().hex}"
+        gen_dir = os.path.join(address_dir, name)
+        os.makedirs(gen_dir)
+        try:
+            flag_cols = [c for c in rows.columns if c.endswith('_flag')]
+            for res, width in ROLLUP_RESOLUTIONS.items():
+                table, sketch = _aggregate(rows, seconds, width, flag_cols, counterparty_col)
+                span = _segment_span(width)
+                table_seg = table['bucket'].to_numpy() // span
+                sketch_seg = sketch['bucket'].to_numpy() // span
+                touched = np.unique(table_seg)
+
+                for seg in touched:
+                    old_table, old_sketch = _load_segment(old_gen, res, seg)
+                    seg_sketch = _kmv_merge(pd.concat([old_sketch, sketch[sketch_seg == seg]], ignore_index=True))
+                    seg_table = _merge_tables(old_table, table[table_seg == seg].reset_index(drop=True))
+                    seg_table['counterparty_n'] = \
+                        seg_table['bucket'].map(_kmv_estimate(seg_sketch)).fillna(0).astype(int)
+                    _write_segment(gen_dir, res, seg, seg_table, seg_sketch)
+                for seg in _list_segments(old_gen, res):
+                    if seg not in touched:
+                        _carry_segment(old_gen, gen_dir, res, seg)
+
+            fresh_keys = np.unique(tx_keys[fresh][valid])
+            np.savez_compressed(os.path.join(gen_dir, "seen.npz"), seen=np.union1d(seen, fresh_keys))
+            _switch_generation(address_dir, name)
+        except BaseException:
+            shutil.rmtree(gen_dir, ignore_errors=True)
+            raise
+    return len(fresh_keys)
+
+
+def load_rollup(address, resolution='hour', root=ROLLUP_DIR):
+    """
+    대시보드/저해상도 탐지용 롤업 조회 (요청한 해상도 파일 하나만 읽음)
+    - 입력: 주소, 해상도 ('minute' | 'hour' | 'day' | 'week')
+    - 출력: bucket(datetime) 기준 정렬된 집계 DataFrame (없으면 빈 DataFrame)
+    """
+    if resolution not in ROLLUP_RESOLUTIONS:
+        raise ValueError(f"❗ 지원하지 않는 해상도입니다: {resolution}")
+
+    table = load_rollup_state(address, root, resolutions=[resolution])['tables'].get(resolution)
+    if table is None or table.empty:
+        return pd.DataFrame()
+
+    table = table.copy()
+    table['bucket'] = pd.to_datetime(table['bucket'], unit='s', utc=True)
+    return table
@@ -0,0 +1,263 @@
+# 선언형 탐지 규칙 (rules.json) → 중복 제거된 피처 계획 → 벡터화 평가
+
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from config import RULES_PATH
+from burst_detector import rolling_window_counts
+
+# 피처 표기: "이름" 또는 "이름:인자" (인자는 숫자 또는 다른 피처, 예: "abs:zscore:btc_value")
+# - 컬럼: btc_value, tx_input_n, tx_output_n, ts (epoch 초)
+#   + 파싱 시 계산된 트랜잭션 형태 피처: fee_rate, fan_out_ratio, equal_output_n, coinjoin_flag, change_flag
+# - gap: 직전 거래와의 간격 (초, 첫 행은 NaN)
+# - rolling_count:W: 직전 W초 (현재 포함) 거래 수
+# - amount_repeat:D: 소수점 D자리로 반올림한 금액이 같은 거래 수
+# - zscore:F, abs:F: 행 단위 변환
+# - mean:F, std:F, median:F: 주소 단위 스칼라 (모든 행에 같은 값)
+COLUMN_FEATURES = (
+    'btc_value', 'tx_input_n', 'tx_output_n',
+    'fee_rate', 'fan_out_ratio', 'equal_output_n', 'coinjoin_flag', 'change_flag'
+)
+SCALAR_FEATURES = ('mean', 'std', 'median')
+
+OPS = {
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+    '==': np.equal,
+    '!=': np.not_equal,
+}
+
+
+def _split(spec):
+    name, _, arg = spec.partition(':')
+    return name, arg
+
+
+def feature_dependencies(spec):
+    """
+    피처 1개가 의존하는 하위 피처 (계산 순서 결정용)
+    - 인자도 함께 검증 (잘못된 피처는 평가 시점이 아니라 규칙 로드 시점에 ValueError)
+      · rolling_count:W는 양의 정수, amount_repeat:D는 0 이상의 정수
+      · zscore / abs / mean / std / median의 대상은 행 단위 피처 (스칼라 피처 불가)
+      · 그 밖의 피처는 인자를 받지 않음
+    """
+    name, arg = _split(spec)
+    if name in ('zscore', 'abs') + SCALAR_FEATURES:
+        if not arg:
+            raise ValueError(f"❗ '{name}' 피처에는 대상 피처가 필요합니다: {spec}")
+        if _split(arg)[0] in SCALAR_FEATURES:
+            raise ValueError(f"❗ '{name}' 피처의 대상은 행 단위 피처여야 합니다 (스칼라 피처 불가): {spec}")
+        return [arg]
+    if name == 'rolling_count':
+        if not (arg.isascii() and arg.isdigit()) or int(arg) <= 0:
+            raise ValueError(f"❗ rolling_count에는 양의 정수 창 길이(초)가 필요합니다: {spec}")
+        return ['ts']
+    if name == 'amount_repeat':
+        if not (arg.isascii() and arg.isdigit()):
+            raise ValueError(f"❗ amount_repeat에는 0 이상의 정수 소수 자릿수가 필요합니다: {spec}")
+        return ['btc_value']
+    if name in COLUMN_FEATURES + ('ts', 'gap'):
+        if arg:
+            raise ValueError(f"❗ '{name}' 피처는 인자를 받지 않습니다: {spec}")
+        return ['ts'] if name == 'gap' else []
+    raise ValueError(f"❗ 알 수 없는 피처입니다: {spec}")
+
+
+def _compute_feature(spec, frame, values):
+    name, arg = _split(spec)
+    if name == 'ts':
+        return frame['ts'].to_numpy()
+    if name in COLUMN_FEATURES:
+        return pd.to_numeric(frame[name], errors='coerce').to_numpy(dtype=float) if name in frame.columns \
+            else np.full(len(frame), np.nan)
+    if name == 'gap':
+        gap = np.empty(len(frame))
+        gap[:1] = np.nan
+        gap[1:] = np.diff(values['ts'])
+        return gap
+    if name == 'rolling_count':
+        return rolling_window_counts(values['ts'], int(arg)).astype(float)
+    if name == 'amount_repeat':
+        rounded = np.round(values['btc_value'], int(arg))
+        _, inverse, counts = np.unique(rounded, return_inverse=True, return_counts=True)
+        return counts[inverse].astype(float)
+    if name == 'abs':
+        return np.abs(values[arg])
+    if name == 'zscore':
+        target = values[arg]
+        std = np.nanstd(target, ddof=1) if np.sum(~np.isnan(target)) > 1 else np.nan
+        if not std or np.isnan(std):
+            return np.zeros(len(target))
+        return (target - np.nanmean(target)) / std
+    if name == 'mean':
+        return np.nanmean(values[arg]) if len(values[arg]) else np.nan
+    if name == 'std':
+        return np.nanstd(values[arg], ddof=1) if np.sum(~np.isnan(values[arg])) > 1 else np.nan
+    if name == 'median':
+        return np.nanmedian(values[arg]) if len(values[arg]) else np.nan
+    raise ValueError(f"❗ 알 수 없는 피처입니다: {spec}")
+
+
+RULE_KEYS = {'name', 'description', 'weight', 'when'}
+GROUP_KEYS = ('all', 'any', 'not')
+COMPARISON_KEYS = {'feature', 'op', 'value'}
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _condition_features(cond, out):
+    """
+    조건 노드 검증 + 사용 피처 수집 (잘못된 노드는 로드 시점에 ValueError)
+    - 그룹 노드: all / any / not 중 정확히 하나의 키만 (all/any는 비어 있지 않은 리스트, not은 노드 1개)
+    - 비교 노드: feature / op / value 키만, 모두 필수 (value는 숫자 또는 {"feature": ...})
+    """
+    if not isinstance(cond, dict):
+        raise ValueError(f"❗ 조건은 객체여야 합니다: {cond}")
+    groups = [key for key in GROUP_KEYS if key in cond]
+    if groups:
+        if len(cond) != 1:
+            raise ValueError(f"❗ 그룹 조건에는 {'/'.join(GROUP_KEYS)} 중 키 하나만 쓸 수 있습니다: {cond}")
+        key = groups[0]
+        if key == 'not':
+            return _condition_features(cond['not'], out)
+        if not isinstance(cond[key], list) or not cond[key]:
+            raise ValueError(f"❗ '{key}'에는 비어 있지 않은 조건 리스트가 필요합니다: {cond}")
+        for sub in cond[key]:
+            _condition_features(sub, out)
+        return out
+
+    unknown = set(cond) - COMPARISON_KEYS
+    missing = COMPARISON_KEYS - set(cond)
+    if unknown or missing:
+        raise ValueError(f"❗ 비교 조건 형식이 잘못되었습니다 (알 수 없는 키: {sorted(unknown)}, "
+                         f"누락된 키: {sorted(missing)}): {cond}")
+    if cond['op'] not in OPS:
+        raise ValueError(f"❗ 지원하지 않는 비교 연산자입니다: {cond['op']}")
+    if not isinstance(cond['feature'], str):
+        raise ValueError(f"❗ feature는 문자열이어야 합니다: {cond}")
+    out.append(cond['feature'])
+
+    value = cond['value']
+    if isinstance(value, dict):
+        if set(value) != {'feature'} or not isinstance(value['feature'], str):
+            raise ValueError(f"❗ 피처 비교 값은 {{\"feature\": \"...\"}} 형식이어야 합니다: {cond}")
+        out.append(value['feature'])
+    elif not _is_number(value):
+        raise ValueError(f"❗ 비교 값은 숫자 또는 피처여야 합니다: {cond}")
+    return out
+
+
+def compile_rules(rules):
+    """
+    규칙 리스트 → 실행 계획
+    - 모든 규칙의 피처를 모아 중복 제거 후 의존 순서대로 정렬 (공유 피처는 한 번만 계산)
+    - 반환: {'features': [피처 순서], 'rules': [규칙]}
+    """
+    plan, visiting = [], set()
+
+    def visit(spec):
+        if spec in plan:
+            return
+        if spec in visiting:
+            raise ValueError(f"❗ 피처 정의가 순환합니다: {spec}")
+        visiting.add(spec)
+        for dep in feature_dependencies(spec):
+            visit(dep)
+        visiting.discard(spec)
+        plan.append(spec)
+
+    names = set()
+    for rule in rules:
+        if not isinstance(rule, dict) or 'name' not in rule or 'when' not in rule:
+            raise ValueError(f"❗ 규칙에는 name과 when이 필요합니다: {rule}")
+        unknown = set(rule) - RULE_KEYS
+        if unknown:
+            raise ValueError(f"❗ 규칙에 알 수 없는 키가 있습니다: {sorted(unknown)} ({rule['name']})")
+        if 'weight' in rule and not (_is_number(rule['weight']) and rule['weight'] >= 0):
+            raise ValueError(f"❗ weight는 0 이상의 숫자여야 합니다: {rule['weight']} ({rule['name']})")
+        if rule['name'] in names:
+            raise ValueError(f"❗ 규칙 이름이 중복됩니다: {rule['name']}")
+        names.add(rule['name'])
+        for spec in _condition_features(rule['when'], []):
+            visit(spec)
+    return {'features': plan, 'rules': list(rules)}
+
+
+def _evaluate_condition(cond, values, n):
+    if 'all' in cond:
+        result = np.ones(n, dtype=bool)
+        for sub in cond['all']:
+            result &= _evaluate_condition(sub, values, n)
+        return result
+    if 'any' in cond:
+        result = np.zeros(n, dtype=bool)
+        for sub in cond['any']:
+            result |= _evaluate_condition(sub, values, n)
+        return result
+    if 'not' in cond:
+        return ~_evaluate_condition(cond['not'], values, n)
+
+    left = values[cond['feature']]
+    right = cond['value']
+    if isinstance(right, dict):
+        right = values[right['feature']]
+    with np.errstate(invalid='ignore'):
+        return np.broadcast_to(OPS[cond['op']](left, right), (n,)).copy()
+
+
+def evaluate_rules(df, plan):
+    """
+    컴파일된 규칙을 DataFrame에 적용
+    - 거래 시각 기준 안정 정렬 후 계획 순서대로 피처를 한 번씩 계산
+    - 반환: (df와 같은 인덱스의 규칙별 플래그 DataFrame, 규칙별 점수 dict)
+      점수 = 플래그 비율 × weight (정수화, 최대 weight), weight 기본 25
+    """
+    if df.empty or 'confirmed' not in df.columns:
+        return pd.DataFrame(index=df.index), {rule['name']: 0 for rule in plan['rules']}
+
+    ts = pd.to_datetime(df['confirmed'], errors='coerce', utc=True)
+    frame = df.assign(ts=ts)[ts.notna()].sort_values('ts', kind='mergesort')
+    frame['ts'] = frame['ts'].to_numpy(dtype='datetime64[ns]').astype(np.int64) / 1e9
+
+    values = {}
+    for spec in plan['features']:
+        values[spec] = _compute_feature(spec, frame, values)
+
+    n = len(frame)
+    flags = pd.DataFrame(index=frame.index)
+    scores = {}
+    for rule in plan['rules']:
+        flag = _evaluate_condition(rule['when'], values, n) if n else np.zeros(0, dtype=bool)
+        flags[rule['name']] = flag
+        weight = rule.get('weight', 25)
+        ratio = flag.sum() / n if n > 0 else 0
+        scores[rule['name']] = min(int(ratio * weight), weight)
+    flags = flags.reindex(df.index, fill_value=False)
+    return flags, scores
+
+
+_cache = {'key': None, 'plan': None}
+_cache_lock = threading.Lock()
+
+
+def load_rules(path=RULES_PATH):
+    """
+    규칙 파일을 읽어 컴파일 (파일 수정 시각이 같으면 이전 계획 재사용)
+    """
+    key = (path, os.path.getmtime(path))
+    with _cache_lock:
+        if _cache['key'] == key:
+            return _cache['plan']
+    with open(path, encoding="utf-8") as f:
+        plan = compile_rules(json.load(f)['rules'])
+    with _cache_lock:
+        _cache['key'], _cache['plan'] = key, plan
+    return plan
@@ -0,0 +1,238 @@
+# 제재 주소 목록 버전 관리 + 변경분 기반 재검사 (출처별 provenance 포함)
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from config import SANCTION_SOURCES, SANCTIONS_DIR, SANCTION_EXPOSURE_SCORE
+
+
+def read_list(path):
+    """
+    제재 주소 파일 1개 읽기 (빈 줄/주석(#) 제외, 파일이 없으면 빈 집합)
+    """
+    try:
+        with open(path, "r") as f:
+            return set(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    except OSError:
+        return set()
+
+
+def list_version(addresses):
+    """
+    주소 집합의 버전 해시 (정렬 후 sha256 앞 16자리)
+    """
+    digest = hashlib.sha256("\n".join(sorted(addresses)).encode())
+    return digest.hexdigest()[:16]
+
+
+def load_sanctioned(sources=None):
+    """
+    모든 출처의 제재 주소 → 출처 이름 리스트 dict
+    - `address in load_sanctioned()` 형태로 기존 set처럼 사용 가능
+    """
+    sources = sources or SANCTION_SOURCES
+    sanctioned = {}
+    for name, path in sources.items():
+        for address in read_list(path):
+            sanctioned.setdefault(address, []).append(name)
+    return sanctioned
+
+
+@contextlib.contextmanager
+def _connect(root=SANCTIONS_DIR):
+    # 커밋 후 연결까지 닫음 (sqlite3 연결의 with 문은 커밋만 수행)
+    os.makedirs(root, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(root, "cases.db"), timeout=30)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS cases (
+            case_address TEXT PRIMARY KEY,
+            cluster TEXT,
+            analyzed_at REAL,
+            total_score INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS touches (
+            counterparty TEXT NOT NULL,
+            case_address TEXT NOT NULL,
+            PRIMARY KEY (counterparty, case_address)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS list_versions (
+            source TEXT PRIMARY KEY,
+            version TEXT,
+            updated_at REAL
+        );
+        CREATE TABLE IF NOT EXISTS alerts (
+            created_at REAL,
+            source TEXT,
+            version TEXT,
+            change TEXT,
+            counterparty TEXT,
+            case_address TEXT
+        );
+    """)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def counterparties(tx_json):
+    """
+    BlockCypher 응답에서 입력/출력에 등장한 모든 주소
+    """
+    found = set()
+    txs = tx_json.get("txs", []) if isinstance(tx_json, dict) else []
+    for tx in txs:
+        for side in ("inputs", "outputs"):
+            for item in tx.get(side, []):
+                found.update(item.get("addresses") or [])
+    return found
+
+
+def record_case(case_address, tx_json, total_score=None, cluster=None, root=SANCTIONS_DIR):
+    """
+    분석한 주소(case)와 그 거래에 등장한 상대 주소를 역색인에 기록
+    - 이후 목록에 새로 추가된 주소가 어떤 case에 닿았는지 바로 조회 가능
+    - cluster: 같은 클러스터로 묶인 case 식별자 (선택)
+    """
+    touched = counterparties(tx_json)
+    touched.add(case_address)
+    with _connect(root) as conn:
+        conn.execute(
+            "INSERT INTO cases (case_address, cluster, analyzed_at, total_score) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (case_address) DO UPDATE SET analyzed_at = excluded.analyzed_at, "
+            "cluster = COALESCE(excluded.cluster, cases.cluster), "
+            "total_score = COALESCE(excluded.total_score, cases.total_score)",
+            (case_address, cluster, time.time(), total_score)
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO touches (counterparty, case_address) VALUES (?, ?)",
+            ((addr, case_address) for addr in touched)
+        )
+    return len(touched)
+
+
+def sanctioned_score(case_address, total_score, tx_json, sanctioned):
+    """
+    탐지 점수에 제재 목록 반영
+    - case 주소 자체가 목록에 있으면 100 (앱의 블랙리스트 판정과 동일)
+    - 거래 상대 주소 중 목록에 있는 주소가 있으면 최소 SANCTION_EXPOSURE_SCORE
+    - 반환: (최종 점수, 목록에 있는 상대 주소 집합)
+    """
+    if case_address in sanctioned:
+        return 100, set()
+    exposed = {addr for addr in counterparties(tx_json) if addr in sanctioned}
+    if exposed:
+        total_score = max(total_score, SANCTION_EXPOSURE_SCORE)
+    return total_score, exposed
+
+
+def _snapshot_path(root, source):
+    return os.path.join(root, f"{source}.snapshot")
+
+
+def diff_source(name, path, root=SANCTIONS_DIR):
+    """
+    출처 1개의 현재 목록과 마지막 스냅샷 비교
+    - 반환: (현재 버전, 추가된 주소 집합, 삭제된 주소 집합, 현재 주소 집합)
+    """
+    current = read_list(path)
+    previous = read_list(_snapshot_path(root, name))
+    return list_version(current), current - previous, previous - current, current
+
+
+def rescreen(sources=None, rescore=None, root=SANCTIONS_DIR):
+    """
+    제재 목록 변경분만 재검사
+    - 출처별로 이전 스냅샷과 비교해 추가/삭제된 주소만 추림 (첫 실행은 전체가 추가분)
+    - 역색인으로 해당 주소에 닿았던 case만 찾아 alert 기록
+    - rescore(case_address)가 주어지면 영향받은 case만 다시 점수화해 반영
+    - 반환: alert 리스트 (source / version / change / counterparty / case_address / cluster)
+    """
+    sources = sources or SANCTION_SOURCES
+    alerts = []
+    snapshots = {}
+    with _connect(root) as conn:
+        for name, path in sources.items():
+            version, added, removed, current = diff_source(name, path, root)
+            row = conn.execute("SELECT version FROM list_versions WHERE source = ?", (name,)).fetchone()
+            if row and row[0] == version:
+                if added or removed:
+                    # 커밋 후 스냅샷 쓰기 전에 중단된 경우: alert는 이미 기록됨, 스냅샷만 맞춤
+                    snapshots[name] = current
+                continue
+
+            for change, addresses in (("added", added), ("removed", removed)):
+                for counterparty in addresses:
+                    hits = conn.execute(
+                        "SELECT t.case_address, c.cluster FROM touches t LEFT JOIN cases c USING (case_address) "
+                        "WHERE t.counterparty = ?", (counterparty,)
+                    ).fetchall()
+                    for case_address, cluster in hits:
+                        alerts.append({
+                            'source': name, 'version': version, 'change': change,
+                            'counterparty': counterparty, 'case_address': case_address, 'cluster': cluster,
+                        })
+
+            snapshots[name] = current
+            conn.execute("INSERT OR REPLACE INTO list_versions (source, version, updated_at) VALUES (?, ?, ?)",
+                         (name, version, time.time()))
+
+        conn.executemany(
+            "INSERT INTO alerts (created_at, source, version, change, counterparty, case_address) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            ((time.time(), a['source'], a['version'], a['change'], a['counterparty'], a['case_address'])
+             for a in alerts)
+        )
+
+    # 스냅샷은 alert/버전 트랜잭션이 커밋된 뒤에만 교체 (커밋 전 실패 시 다음 실행에서 같은 변경분을 다시 검사)
+    for name, current in snapshots.items():
+        tmp_path = _snapshot_path(root, name) + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(sorted(current)))
+        os.replace(tmp_path, _snapshot_path(root, name))
+
+    if rescore:
+        for case_address in sorted({a['case_address'] for a in alerts}):
+            score = rescore(case_address)
+            if score is not None:
+                with _connect(root) as conn:
+                    conn.execute("UPDATE cases SET total_score = ?, analyzed_at = ? WHERE case_address = ?",
+                                 (score, time.time(), case_address))
+    return alerts
+
+
+def _rescore_case(case_address):
+    # CLI 재점수화: 최신 거래를 다시 받아 앱과 같은 참조 분포/제재 판정으로 계산
+    from fetch_data import get_transactions, parse_blockcypher_transactions
+    from pipeline import run_analysis
+    from reference_stats import load_reference
+
+    tx_json = get_transactions(case_address)
+    df = parse_blockcypher_transactions(tx_json)
+    if df.empty:
+        return 100 if case_address in load_sanctioned() else None
+    total_score = run_analysis(df, reference=load_reference())[-1]
+    total_score, _ = sanctioned_score(case_address, total_score, tx_json, load_sanctioned())
+    record_case(case_address, tx_json)
+    return total_score
+
+
+def main():
+    parser = argparse.ArgumentParser(description="제재 목록 변경분 기반 case 재검사")
+    parser.add_argument("--rescore", action="store_true", help="영향받은 case만 다시 점수화")
+    args = parser.parse_args()
+
+    alerts = rescreen(rescore=_rescore_case if args.rescore else None)
+    for alert in alerts:
+        print(json.dumps(alert, ensure_ascii=False))
+    print(f"{len(alerts)} alert(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# 프로세스 전역 요청 병합 (single-flight): 같은 키의 동시 요청은 한 번만 실행하고 결과 공유
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from config import SINGLEFLIGHT_MAX_ENTRIES, SINGLEFLIGHT_FETCH_TTL_SEC, SINGLEFLIGHT_ANALYSIS_TTL_SEC
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.succeeded = False
+
+
+class SingleFlight:
+    """
+    같은 키로 동시에 들어온 요청을 하나의 실행으로 병합
+    - 실행 중인 키: 뒤따른 요청은 완료를 기다렸다가 같은 결과 객체를 받음
+    - 완료된 결과는 ttl_sec 동안 최대 max_entries개까지 LRU로 보관 (메모리 상한)
+    - 공유 결과는 불변으로 취급해야 함 (호출 측에서 수정 금지)
+    - 예외는 기다리던 모든 요청에 그대로 전달되고 캐시에 남지 않음
+    - 실행이 Exception이 아닌 BaseException(Streamlit StopException/RerunException, KeyboardInterrupt 등)으로
+      끝나면 결과 없이 중단된 것으로 보고 캐시하지 않음, 기다리던 요청은 자기 fn으로 다시 시도
+    """
+
+    def __init__(self, max_entries=SINGLEFLIGHT_MAX_ENTRIES, ttl_sec=SINGLEFLIGHT_FETCH_TTL_SEC):
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._cache = OrderedDict()
+        self._metrics = {'executed': 0, 'coalesced': 0, 'cache_hits': 0, 'errors': 0, 'aborted': 0}
+
+    def do(self, key, fn, cache_if=None):
+        """
+        key에 대해 fn()을 최대 한 번만 실행하고 결과 반환
+        - cache_if(result)가 False면 결과를 캐시에 남기지 않음 (예: 빈 API 응답)
+        """
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl_sec:
+                self._cache.move_to_end(key)
+                self._metrics['cache_hits'] += 1
+                return entry[1]
+
+            call = self._inflight.get(key)
+            if call is not None:
+                self._metrics['coalesced'] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._inflight[key] = call
+                self._metrics['executed'] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            if not call.succeeded:
+                # 선행 실행이 중단됨 → 결과가 없으므로 이 요청이 다시 실행
+                with self._lock:
+                    self._metrics['aborted'] += 1
+                return self.do(key, fn, cache_if)
+            return call.result
+
+        try:
+            call.result = fn()
+            call.succeeded = True
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self._metrics['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                if call.succeeded and (cache_if is None or cache_if(call.result)):
+                    self._cache[key] = (time.monotonic(), call.result)
+                    self._cache.move_to_end(key)
+                    while len(self._cache) > self.max_entries:
+                        self._cache.popitem(last=False)
+            call.done.set()
+        return call.result
+
+    def metrics(self):
+        """
+        병합/실행 통계 (executed: 실제 실행, coalesced: 실행 중 합류, cache_hits: 완료 결과 재사용,
+        aborted: 선행 실행 중단으로 다시 시도한 요청)
+        """
+        with self._lock:
+            stats = dict(self._metrics)
+            stats['inflight'] = len(self._inflight)
+            stats['cached'] = len(self._cache)
+        return stats
+
+
+def data_version(raw_json):
+    """
+    BlockCypher 응답의 데이터 버전 (tx_hash + 블록 높이 목록의 해시)
+    - 같은 주소라도 새 거래나 확정 상태가 바뀌면 다른 버전이 됨
+    """
+    txs = raw_json.get("txs", []) if isinstance(raw_json, dict) else []
+    digest = hashlib.sha1()
+    for tx in txs:
+        digest.update(f"{tx.get('hash')}:{tx.get('block_height')};".encode())
+    return digest.hexdigest()
+
+
+# Streamlit 세션 전체가 공유하는 인스턴스
+# - 조회: 짧은 TTL (최신 거래 반영), 분석: 데이터 버전이 키에 포함되므로 긴 TTL
+fetch_flight = SingleFlight(ttl_sec=SINGLEFLIGHT_FETCH_TTL_SEC)
+analysis_flight = SingleFlight(ttl_sec=SINGLEFLIGHT_ANALYSIS_TTL_SEC)
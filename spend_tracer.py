@@ -0,0 +1,139 @@
+# spent_by 링크 기반 자금 이동 추적 + peel chain 탐지
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from http_transport import http_get_json
+from fetch_data import build_tx_url
+
+
+def fetch_tx(tx_hash):
+    return http_get_json(build_tx_url(tx_hash))
+
+
+def prefetch_layer(tx_hashes, fetch=fetch_tx, max_workers=4):
+    """
+    한 단계(layer)의 트랜잭션들을 동시에 조회
+    - 반환: (tx_hash → tx dict, 실패한 tx_hash 리스트)
+    """
+    fetched, failed = {}, []
+    if not tx_hashes:
+        return fetched, failed
+
+    def job(tx_hash):
+        try:
+            return tx_hash, fetch(tx_hash)
+        except Exception:
+            return tx_hash, None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for tx_hash, tx in pool.map(job, tx_hashes):
+            if tx:
+                fetched[tx_hash] = tx
+            else:
+                failed.append(tx_hash)
+    return fetched, failed
+
+
+def _output_values(tx):
+    return [out.get("value", 0) or 0 for out in tx.get("outputs", [])]
+
+
+def peel_split(tx, peel_ratio=0.2):
+    """
+    peel 형태 판별: 출력이 정확히 2개이고 작은 쪽이 전체의 peel_ratio 이하
+    - 반환: (큰 출력 = 잔돈, 작은 출력 = 지불) 출력 dict 쌍, 아니면 None
+    """
+    outputs = tx.get("outputs", [])
+    if len(outputs) != 2:
+        return None
+    values = _output_values(tx)
+    total = sum(values)
+    if total <= 0:
+        return None
+    change, payment = (outputs[0], outputs[1]) if values[0] >= values[1] else (outputs[1], outputs[0])
+    if (payment.get("value", 0) or 0) / total > peel_ratio:
+        return None
+    return change, payment
+
+
+def trace_spend_chains(df, address=None, max_hops=5, max_requests=30, max_workers=4,
+                       peel_ratio=0.2, fetch=fetch_tx):
+    """
+    parse_blockcypher_transactions 결과의 spent 컬럼(spent_by)에서 시작해 자금 이동을 앞으로 추적
+    - 단계별로 다음 layer의 tx를 동시에 미리 조회, 이미 본 tx는 다시 조회하지 않음
+    - peel 형태 tx는 잔돈 출력의 spent_by만 다음 layer에 넣음 (지불 쪽은 체인 결과에 쓰이지 않음)
+    - 조회는 금액이 큰 출력 순으로 max_requests건까지만 (요청 예산)
+    - address가 주어지면 해당 주소로 들어온 출력만 시작점으로 사용
+    - 반환: (체인별 요약 DataFrame, 통계 dict)
+      · root_tx: 시작 spent_by tx / peel_length: 연속 peel 단계 수
+      · leaked_btc: peel 단계마다 빠져나간 작은 출력 합계 / last_tx: 마지막으로 확인한 tx
+      · truncated: 예산·hop 제한으로 체인 끝까지 확인하지 못했는지 여부
+    """
+    stats = {'requests': 0, 'fetched': 0, 'failed': 0, 'hops': 0}
+    if df.empty or 'spent' not in df.columns:
+        return pd.DataFrame(), stats
+
+    roots = df[df['spent'].notna()]
+    if address and 'address' in df.columns:
+        roots = roots[roots['address'] == address]
+    roots = roots.sort_values('btc_value', ascending=False)['spent'].drop_duplicates().tolist()
+
+    txs = {}
+    layer = roots
+    for hop in range(max_hops):
+        layer = [h for h in dict.fromkeys(layer) if h not in txs]
+        budget = max_requests - stats['requests']
+        if not layer or budget <= 0:
+            break
+        layer = layer[:budget]
+        fetched, failed = prefetch_layer(layer, fetch=fetch, max_workers=max_workers)
+        stats['requests'] += len(layer)
+        stats['fetched'] += len(fetched)
+        stats['failed'] += len(failed)
+        stats['hops'] = hop + 1
+        txs.update(fetched)
+
+        # 다음 layer: peel 형태면 체인이 따라가는 잔돈 출력만, 아니면 모든 출력 (금액이 큰 출력부터)
+        next_outputs = []
+        for tx in fetched.values():
+            split = peel_split(tx, peel_ratio)
+            for out in (split[:1] if split else tx.get("outputs", [])):
+                if out.get("spent_by"):
+                    next_outputs.append((out.get("value", 0) or 0, out["spent_by"]))
+        layer = [h for _, h in sorted(next_outputs, key=lambda x: x[0], reverse=True)]
+
+    chains = []
+    for root in roots:
+        tx_hash, peel_length, leaked, last_tx, seen = root, 0, 0, None, set()
+        truncated = False
+        while tx_hash and tx_hash not in seen:
+            seen.add(tx_hash)
+            tx = txs.get(tx_hash)
+            if tx is None:
+                truncated = True
+                break
+            last_tx = tx_hash
+            split = peel_split(tx, peel_ratio)
+            if split is None:
+                break
+            change, payment = split
+            peel_length += 1
+            leaked += payment.get("value", 0) or 0
+            tx_hash = change.get("spent_by")
+
+        if last_tx is None:
+            continue
+        chains.append({
+            'root_tx': root,
+            'peel_length': peel_length,
+            'leaked_btc': leaked / 1e8,
+            'last_tx': last_tx,
+            'truncated': truncated,
+        })
+
+    result = pd.DataFrame(chains)
+    if not result.empty:
+        result = result.sort_values(['peel_length', 'leaked_btc'], ascending=False).reset_index(drop=True)
+    return result, stats
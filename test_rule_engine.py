@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rule_engine import compile_rules, evaluate_rules, load_rules
+
+
+def _rule(feature, value=1):
+    return {'name': 'r', 'when': {'feature': feature, 'op': '>', 'value': value}}
+
+
+def _sample():
+    return pd.DataFrame({
+        'tx_hash': [f"t{i}" for i in range(6)],
+        'confirmed': pd.date_range('2024-01-01', periods=6, freq='30s', tz='UTC'),
+        'btc_value': [0.1, 0.1, 0.25, 1.5, 0.1, 0.3],
+    })
+
+
+def test_rules_file_compiles_and_evaluates():
+    plan = load_rules()
+    flags, scores = evaluate_rules(_sample(), plan)
+    assert set(scores) == {rule['name'] for rule in plan['rules']}
+
+
+@pytest.mark.parametrize('feature', [
+    'rolling_count:60',
+    'amount_repeat:0',
+    'amount_repeat:4',
+    'abs:zscore:btc_value',
+    'mean:gap',
+])
+def test_valid_feature_arguments(feature):
+    evaluate_rules(_sample(), compile_rules([_rule(feature)]))
+
+
+@pytest.mark.parametrize('feature', [
+    'rolling_count',
+    'rolling_count:abc',
+    'rolling_count:0',
+    'rolling_count:-5',
+    'rolling_count:1.5',
+    'amount_repeat',
+    'amount_repeat:-1',
+    'amount_repeat:x',
+    'zscore:mean:btc_value',
+    'abs:std:gap',
+    'mean:median:btc_value',
+    'btc_value:3',
+    'gap:60',
+])
+def test_invalid_feature_arguments_rejected_at_compile(feature):
+    with pytest.raises(ValueError):
+        compile_rules([_rule(feature)])
+
+
+@pytest.mark.parametrize('rule', [
+    {'name': 'r', 'when': {'all': [{'feature': 'gap', 'op': '>', 'value': 1}],
+                           'any': [{'feature': 'gap', 'op': '<', 'value': 1}]}},
+    {'name': 'r', 'when': {'feature': 'gap', 'op': '>'}},
+    {'name': 'r', 'when': {'feature': 'gap', 'op': '>', 'value': 1, 'extra': 1}},
+    {'name': 'r', 'weight': '25', 'when': {'feature': 'gap', 'op': '>', 'value': 1}},
+    {'name': 'r', 'when': {'all': []}},
+])
+def test_malformed_nodes_rejected_at_compile(rule):
+    with pytest.raises(ValueError):
+        compile_rules([rule])
+
+
+def test_scalar_feature_comparison_broadcasts():
+    plan = compile_rules([{'name': 'r', 'when': {'feature': 'btc_value', 'op': '>',
+                                                 'value': {'feature': 'mean:btc_value'}}}])
+    flags, _ = evaluate_rules(_sample(), plan)
+    assert np.asarray(flags['r']).tolist() == [False, False, False, True, False, False]
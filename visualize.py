@@ -14,8 +14,7 @@ def plot_transaction_timeline(df, anomaly_col=None):
     if df.empty or 'confirmed' not in df.columns or 'btc_value' not in df.columns:
         return None
 
-    plot_df = df.copy()
-    plot_df = plot_df.sort_values('confirmed')
+    plot_df = df.sort_values('confirmed')  # 정렬 결과가 이미 사본
 
     if anomaly_col and anomaly_col in df.columns:
         plot_df['anomaly'] = plot_df[anomaly_col].map({True: '이상', False: '정상'})
@@ -94,13 +93,15 @@ def extract_edges_from_tx_list(tx_list):
 
 
 
-def plot_transaction_network(tx_list):
+def plot_transaction_network(tx_list, edges=None):
     """
     📡 거래 네트워크 시각화 (Plotly + NetworkX)
     - 노드: 주소
     - 엣지: 거래 흐름
+    - edges가 주어지면 (예: graph_store 조회 결과) tx_list 대신 사용
     """
-    edges = extract_edges_from_tx_list(tx_list)
+    if edges is None:
+        edges = extract_edges_from_tx_list(tx_list)
     if not edges:
         return None
 
@@ -160,12 +161,13 @@ def plot_transaction_network(tx_list):
 
 
 
-def plot_mini_transaction_network(tx_list, max_edges=10):
+def plot_mini_transaction_network(tx_list, max_edges=10, edges=None):
     """
     🎨 간단하고 예쁜 미니 네트워크 시각화 (Top N edges)
     - 단순 요약 목적
     """
-    edges = extract_edges_from_tx_list(tx_list)
+    if edges is None:
+        edges = extract_edges_from_tx_list(tx_list)
     if not edges:
         return None
 